@@ -0,0 +1,167 @@
+import csv
+import io
+import os
+import secrets
+
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from bulk_import import IMPORT_BATCH_SIZE, IMPORT_FORMATS, import_users, iter_lines, print_progress
+from config import load_env
+from database import get_db_session, open_session
+from models import User
+from schemas import ImportResponse, UserPage, UserResponse
+
+
+# Load environment variables
+load_env()
+
+# Shared secret for /admin endpoints; they are disabled while it is empty
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+# Rows fetched per keyset query when streaming an export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# Only the columns UserResponse needs, so rows never enter the identity map
+USER_COLUMNS = (User.id, User.email, User.name, User.is_active, User.is_verified, User.created_at)
+
+
+async def require_admin(x_admin_key: str = Header(None)):
+    """Dependency that checks the X-Admin-Key header"""
+    if not ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin API is disabled"
+        )
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, ADMIN_API_KEY):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin key"
+        )
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/users/import", response_model=ImportResponse)
+async def import_users_endpoint(
+    http_request: Request,
+    fmt: str = Query("csv", alias="format"),
+    verified: bool = False,
+    send_email: bool = True,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+):
+    """Bulk import users from a CSV or JSONL request body"""
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, use one of: {', '.join(IMPORT_FORMATS)}"
+        )
+
+    # Rows are parsed from the body as it arrives, so uploads are never held in memory
+    try:
+        report = await import_users(
+            iter_lines(http_request.stream()),
+            fmt=fmt,
+            verified=verified,
+            send_email=send_email,
+            batch_size=batch_size,
+            on_progress=print_progress,
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    return report.summary()
+
+
+class UserFilters:
+    """Query parameters shared by the user listing and export"""
+
+    def __init__(
+        self,
+        is_verified: Optional[bool] = None,
+        is_active: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ):
+        self.conditions = []
+        if is_verified is not None:
+            self.conditions.append(User.is_verified == is_verified)
+        if is_active is not None:
+            self.conditions.append(User.is_active == is_active)
+        if created_after is not None:
+            self.conditions.append(User.created_at >= created_after)
+        if created_before is not None:
+            self.conditions.append(User.created_at < created_before)
+
+
+async def fetch_user_page(db, filters: UserFilters, after_id: Optional[int], limit: int) -> list:
+    """One page of users ordered by id, starting after after_id"""
+    query = select(*USER_COLUMNS).where(*filters.conditions).order_by(User.id).limit(limit)
+    if after_id is not None:
+        # Seek on the primary key index instead of scanning past an OFFSET
+        query = query.where(User.id > after_id)
+    result = await db.execute(query)
+    return [UserResponse.model_validate(row) for row in result.all()]
+
+
+@router.get("/users", response_model=UserPage)
+async def list_users(
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    filters: UserFilters = Depends(),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """List users in id order; pass next_after_id back as after_id for the next page"""
+    items = await fetch_user_page(db, filters, after_id, limit)
+    next_after_id = items[-1].id if len(items) == limit else None
+    return UserPage(items=items, next_after_id=next_after_id)
+
+
+async def stream_users(filters: UserFilters, fmt: str):
+    """Yield the export one keyset chunk at a time"""
+    fields = list(UserResponse.model_fields)
+    if fmt == "csv":
+        yield ",".join(fields) + "\n"
+
+    # The session lives as long as the stream, not the request handler
+    async with open_session() as db:
+        after_id = None
+        while True:
+            users = await fetch_user_page(db, filters, after_id, EXPORT_CHUNK_SIZE)
+            if not users:
+                break
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer, lineterminator="\n")
+                for user in users:
+                    writer.writerow(user.model_dump(mode="json").values())
+                yield buffer.getvalue()
+            else:
+                yield "".join(user.model_dump_json() + "\n" for user in users)
+            if len(users) < EXPORT_CHUNK_SIZE:
+                break
+            after_id = users[-1].id
+
+
+@router.get("/users/export")
+async def export_users(fmt: str = Query("ndjson", alias="format"), filters: UserFilters = Depends()):
+    """Stream every matching user as NDJSON or CSV"""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    filename = f"users.{'jsonl' if fmt == 'ndjson' else fmt}"
+    return StreamingResponse(
+        stream_users(filters, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,32 +1,41 @@
-import bcrypt
+import asyncio
 import os
+import time
 
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
-from fastapi import HTTPException, status
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from typing import Optional
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Sequence
+
+from cache import token_cache
+from config import load_env
+from jwt_keys import ASYMMETRIC_ALGORITHMS, load_key_set
+from password_policy import HashPolicy, current_policy, hash_with_policy, verify_hash
 
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # JWT settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")  # "HS256" with SECRET_KEY, or "RS256" with JWT_KEYS_DIR
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Token introspection limits
+INTROSPECT_MAX_TOKENS = int(os.getenv("INTROSPECT_MAX_TOKENS", "100"))
+# Uncached tokens verified per threadpool job
+INTROSPECT_DECODE_CHUNK = 16
+
 
-# Password hashing - use direct bcrypt to avoid version issues
-def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt directly"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+# Password hashing - bcrypt or argon2id according to the active policy
+def get_password_hash(password: str, policy: Optional[HashPolicy] = None) -> str:
+    """Hash a password with the given policy, or the active one"""
+    return hash_with_policy(password, policy or current_policy())
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return verify_hash(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -38,17 +47,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
+    if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        # Tag the token with its key id so verifiers can pick the key from the JWKS
+        key_set = load_key_set(ALGORITHM)
+        return jwt.encode(to_encode, key_set.signing_key, algorithm=ALGORITHM, headers={"kid": key_set.active_kid})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify a JWT token and return the email"""
+def _verification_key(token: str):
+    """Key to check a token's signature with, or None if its kid is unknown"""
+    if ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        return SECRET_KEY
+    kid = jwt.get_unverified_header(token).get("kid")
+    return load_key_set(ALGORITHM).verification_keys.get(kid)
+
+
+def decode_token(token: str) -> Optional[dict]:
+    """Decode and validate a JWT token, caching its claims until it expires"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+        key = _verification_key(token)
+        if key is None:
             return None
-        return email
+        payload = jwt.decode(token, key, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    exp = payload.get("exp")
+    if exp is not None:
+        token_cache.set(token, payload, ttl=exp - time.time())
+    return payload
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify a JWT token and return the email"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+    return email
+
+
+def _decode_chunk(tokens: List[str]) -> List[Optional[dict]]:
+    return [decode_token(token) for token in tokens]
+
+
+async def decode_tokens(tokens: Sequence[str]) -> List[Optional[dict]]:
+    """Decode many tokens, verifying uncached signatures in parallel threadpool jobs"""
+    payloads = {token: token_cache.get(token) for token in tokens}
+    misses = [token for token, payload in payloads.items() if payload is None]
+    chunks = [misses[i:i + INTROSPECT_DECODE_CHUNK] for i in range(0, len(misses), INTROSPECT_DECODE_CHUNK)]
+    decoded = await asyncio.gather(
+        *(run_in_threadpool(_decode_chunk, chunk) for chunk in chunks)
+    )
+    for chunk, chunk_payloads in zip(chunks, decoded):
+        payloads.update(zip(chunk, chunk_payloads))
+    return [payloads[token] for token in tokens]
@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+from typing import Callable
+
+try:
+    import fcntl
+except ImportError:  # No flock() on Windows; every process runs background jobs there
+    fcntl = None
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Background job settings
+BACKGROUND_LOCK_PATH = os.getenv("BACKGROUND_LOCK_PATH", "")  # unset = this process always runs them
+BACKGROUND_LOCK_RETRY_SECONDS = float(os.getenv("BACKGROUND_LOCK_RETRY_SECONDS", "10"))
+
+
+class BackgroundLeader:
+    """Starts background jobs in only the worker that holds a lock file.
+
+    The OS releases the lock when that worker exits or is recycled, and the
+    next worker to retry takes over.
+    """
+
+    def __init__(self, lock_path: str = BACKGROUND_LOCK_PATH,
+                 retry_seconds: float = BACKGROUND_LOCK_RETRY_SECONDS):
+        self.lock_path = lock_path
+        self.retry_seconds = retry_seconds
+        self.is_leader = False
+        self._file = None
+        self._task = None
+
+    def _try_lock(self) -> bool:
+        handle = open(self.lock_path, "a")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._file = handle
+        return True
+
+    def start(self, on_elected: Callable[[], None]):
+        """Call on_elected now if this process leads, or once it takes over"""
+        if not self.lock_path or fcntl is None:
+            self.is_leader = True
+            on_elected()
+        elif self._task is None:
+            self._task = asyncio.create_task(self.run(on_elected))
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        handle, self._file = self._file, None
+        if handle is not None:
+            handle.close()
+        self.is_leader = False
+
+    async def run(self, on_elected: Callable[[], None]):
+        """Retry the lock until it is ours, then start the jobs"""
+        while not self._try_lock():
+            await asyncio.sleep(self.retry_seconds)
+        self.is_leader = True
+        print(f"Worker {os.getpid()} runs the background jobs")
+        on_elected()
+
+
+background_leader = BackgroundLeader()
@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import os
+import time
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Tuple
+
+from config import load_env
+from database import engine, open_session
+from email_outbox import outbox_row, outbox_worker
+from hashing_pool import hash_passwords
+from models import AuthToken, EmailOutbox, User
+from schemas import UserCreate
+from token_store import VERIFICATION, new_token_row
+
+
+# Load environment variables
+load_env()
+
+# Bulk import settings
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_FORMATS = ("csv", "jsonl")
+CSV_COLUMNS = ("email", "name", "password")
+
+
+class ImportReport:
+    """Running totals and per-row errors for one import"""
+
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.started = time.perf_counter()
+
+    def add_error(self, line: int, error: str, email: Optional[str] = None):
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "email": email, "error": error})
+        else:
+            self.errors_truncated = True
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> dict:
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+        }
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a stream of UTF-8 byte chunks into lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+async def iter_file_lines(path: str) -> AsyncIterator[str]:
+    """Read a local file line by line for the CLI"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line
+
+
+async def iter_records(lines: AsyncIterable[str], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (line number, record dict or error message) for each non-empty line"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+    header = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        line = line.rstrip("\r\n")
+        if line_number == 1:
+            line = line.lstrip("\ufeff")
+        if not line.strip():
+            continue
+
+        if fmt == "jsonl":
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+                continue
+            yield line_number, record if isinstance(record, dict) else "Expected a JSON object"
+            continue
+
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            yield line_number, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [value.strip().lower() for value in values]
+            missing = [column for column in CSV_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+            continue
+        if len(values) != len(header):
+            yield line_number, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield line_number, dict(zip(header, values))
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+def insert_skipping_duplicates(model):
+    """INSERT that silently skips rows violating a unique index"""
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise RuntimeError(f"Bulk import does not support the {engine.dialect.name} dialect")
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=["email"])
+
+
+async def import_batch(batch: List[Tuple[int, UserCreate]], report: ImportReport, verified: bool, send_email: bool):
+    """Hash, insert and queue emails for one batch in a single transaction"""
+    hashed_passwords = await hash_passwords([user.password for _, user in batch])
+    values = [
+        {
+            "email": user.email,
+            "name": user.name,
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_verified": verified,
+        }
+        for (_, user), hashed_password in zip(batch, hashed_passwords)
+    ]
+
+    queued = False
+    async with open_session() as db:
+        try:
+            # One executemany; existing emails are skipped by the unique index
+            result = await db.execute(
+                insert_skipping_duplicates(User).returning(User.id, User.email),
+                values,
+            )
+            created = {row.email: row.id for row in result.all()}
+
+            if send_email and not verified and created:
+                token_rows, email_rows = [], []
+                for _, user in batch:
+                    user_id = created.get(user.email)
+                    if user_id is None:
+                        continue
+                    token, token_row = new_token_row(user_id, VERIFICATION)
+                    token_rows.append(token_row)
+                    email_rows.append(outbox_row("verification", user.email, user.name, token))
+                await db.execute(insert(AuthToken), token_rows)
+                await db.execute(insert(EmailOutbox), email_rows)
+                queued = True
+
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            for line_number, user in batch:
+                report.add_error(line_number, f"Batch failed: {e}", user.email)
+            report.failed += len(batch)
+            return
+
+    for line_number, user in batch:
+        if user.email not in created:
+            report.add_error(line_number, "Email already registered", user.email)
+    report.created += len(created)
+    report.skipped += len(batch) - len(created)
+    if queued:
+        outbox_worker.notify()
+
+
+async def import_users(
+    lines: AsyncIterable[str],
+    fmt: str = "csv",
+    verified: bool = False,
+    send_email: bool = True,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    on_progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """Import users from CSV or JSONL lines in batches, collecting per-row errors"""
+    report = ImportReport()
+    batch: List[Tuple[int, UserCreate]] = []
+    seen_emails = set()
+
+    async def flush():
+        await import_batch(batch, report, verified, send_email)
+        batch.clear()
+        if on_progress is not None:
+            on_progress(report)
+
+    async for line_number, record in iter_records(lines, fmt):
+        report.processed += 1
+        if isinstance(record, str):
+            report.add_error(line_number, record)
+            report.failed += 1
+            continue
+        try:
+            user = UserCreate(**{column: record.get(column) for column in CSV_COLUMNS})
+        except ValidationError as e:
+            report.add_error(line_number, _validation_message(e), record.get("email"))
+            report.failed += 1
+            continue
+        if user.email in seen_emails:
+            report.add_error(line_number, "Duplicate email in import", user.email)
+            report.skipped += 1
+            continue
+        seen_emails.add(user.email)
+
+        batch.append((line_number, user))
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+    return report
+
+
+def print_progress(report: ImportReport):
+    rate = report.processed / report.elapsed_seconds if report.elapsed_seconds else 0.0
+    print(
+        f"Imported {report.processed} rows: {report.created} created, "
+        f"{report.skipped} skipped, {report.failed} failed ({rate:.0f} rows/s)"
+    )
+
+
+async def main(args):
+    from hashing_pool import hashing_pool
+    from password_policy import configure_policy
+
+    print(f"Password hash policy: {configure_policy()}")
+    hashing_pool.start()
+    try:
+        report = await import_users(
+            iter_file_lines(args.path),
+            fmt=args.format,
+            verified=args.verified,
+            send_email=not args.no_email,
+            batch_size=args.batch_size,
+            on_progress=print_progress,
+        )
+    finally:
+        hashing_pool.shutdown()
+
+    for error in report.errors:
+        print(f"❌ line {error['line']} ({error['email'] or '-'}): {error['error']}")
+    if report.errors_truncated:
+        print(f"... more errors omitted (IMPORT_MAX_ERRORS={IMPORT_MAX_ERRORS})")
+    print_progress(report)
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import users from a CSV or JSONL file")
+    parser.add_argument("path", help="CSV with email,name,password columns or JSONL with the same keys")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="defaults to the file extension")
+    parser.add_argument("--verified", action="store_true", help="mark imported accounts as already verified")
+    parser.add_argument("--no-email", action="store_true", help="do not queue verification emails")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    if args.format is None:
+        args.format = "jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv"
+    raise SystemExit(asyncio.run(main(args)))
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Cache settings
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a deadline"""
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or default if it is missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value; ttl overrides the cache default for this entry"""
+        self._store(key, value, ttl, replace=True)
+
+    def add(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store a value only if the key is missing or expired; returns whether it was stored"""
+        return self._store(key, value, ttl, replace=False)
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float], replace: bool) -> bool:
+        if self.maxsize <= 0:
+            return False
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            return False
+        now = time.monotonic()
+        expires_at = now + ttl if ttl is not None else None
+        with self._lock:
+            if not replace:
+                entry = self._data.get(key)
+                if entry is not None and (entry[0] is None or entry[0] > now):
+                    return False
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Decoded JWT claims by token, each kept until the token's own expiry
+token_cache = TTLCache(TOKEN_CACHE_SIZE)
+
+# Serialized user rows for /auth/me, keyed by email
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(email: str):
+    """Drop a user's cached row after it has been written"""
+    user_cache.pop(email)
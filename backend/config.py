@@ -0,0 +1,12 @@
+from dotenv import load_dotenv
+
+
+_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ once per process, however many modules ask"""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
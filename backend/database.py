@@ -1,25 +1,191 @@
 import os
+import threading
+import time
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from config import load_env
+from db_profile import apply_profile, engine_options
+from metrics import Gauge, instrument_engine, pool_checkout_wait_seconds, registry
+from query_stats import instrument_query_stats
 
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Database URL from environment variable
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Use AsyncEngine/AsyncSession instead of running the sync session in a threadpool
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "False").lower() == "true"
+
+# Async drivers used when the URL does not name one explicitly
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Rewrite a sync database URL to use an async driver"""
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+# Create engine with the backend's pool settings and connection pragmas
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(get_async_database_url(DATABASE_URL), **engine_options(DATABASE_URL))
+    engine = async_engine.sync_engine
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+    AsyncSessionLocal = None
+
+apply_profile(engine, DATABASE_URL)
+
+# Count and time every statement for /metrics and per-request stats
+instrument_engine(engine)
+instrument_query_stats(engine)
+
+
+def instrument_pool(engine):
+    """Time how long each connection checkout waits and count connections in use"""
+    lock = threading.Lock()
+    checked_out = set()
+
+    # Pool events only fire once a connection is handed out, so the wait is
+    # measured around raw_connection(); Engine.connect() and the async engine
+    # both go through it, and it survives the pool being recreated by dispose()
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        start = time.perf_counter()
+        connection = raw_connection()
+        pool_checkout_wait_seconds.observe(time.perf_counter() - start, pool="db")
+        return connection
+
+    engine.raw_connection = timed_raw_connection
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        with lock:
+            checked_out.add(id(connection_record))
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        with lock:
+            checked_out.discard(id(connection_record))
+
+    registry.register(Gauge("db_pool_checked_out", "Database connections currently checked out of the pool",
+                            lambda: len(checked_out)))
+
+
+instrument_pool(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+class ThreadedSession:
+    """Awaitable facade over a sync Session that runs blocking calls in the threadpool.
+
+    Mirrors the subset of the AsyncSession API used by the handlers, so the same
+    code runs whether or not DATABASE_ASYNC is enabled.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def _execute(self, statement, params=None):
+        result = self.sync_session.execute(statement, params)
+        # Row-less results (plain DML, ORM bulk inserts) have nothing to buffer; only
+        # CursorResult exposes returns_rows, so ask the result metadata directly
+        if not getattr(result._metadata, "returns_rows", True):
+            return result
+        # Buffer rows in the worker thread so nothing touches the DB on the event loop
+        return result.freeze()()
+
+    async def execute(self, statement, params=None):
+        return await run_in_threadpool(self._execute, statement, params)
+
+    async def scalar(self, statement, params=None):
+        result = await self.execute(statement, params)
+        return result.scalar()
+
+    async def scalars(self, statement, params=None):
+        result = await self.execute(statement, params)
+        return result.scalars()
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+def open_session():
+    """Open an awaitable session for the configured database mode"""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    # Match AsyncSession semantics: no implicit reloads after commit
+    return ThreadedSession(SessionLocal(expire_on_commit=False))
+
+
+async def get_db_session():
+    """Dependency to get an awaitable database session"""
+    async with open_session() as session:
+        yield session
+
+
+def dispose_inherited_connections():
+    """Drop pooled connections copied from a parent process without closing them"""
+    engine.dispose(close=False)
+
+
+async def create_tables(metadata):
+    """Create any missing tables"""
+    if async_engine is not None:
+        async with async_engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+    else:
+        await run_in_threadpool(metadata.create_all, bind=engine)
+
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
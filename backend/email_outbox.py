@@ -0,0 +1,206 @@
+import asyncio
+import os
+import secrets
+
+from datetime import datetime, timedelta
+from sqlalchemy import or_, select, update
+
+from config import load_env
+from database import open_session
+from email_service import EMAIL_KINDS, build_messages
+from models import EmailOutbox
+from smtp_pool import smtp_pool
+from token_store import TOKEN_TTLS
+
+
+# Load environment variables
+load_env()
+
+# Outbox worker settings
+EMAIL_OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "True").lower() == "true"
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "10"))
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", "3600"))
+# Sent and failed entries are kept this long, then deleted by the sweeper
+EMAIL_OUTBOX_RETENTION_HOURS = float(os.getenv("EMAIL_OUTBOX_RETENTION_HOURS", "72"))
+
+# How long a claimed batch is reserved before another worker may retry it
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def outbox_row(kind: str, recipient: str, user_name: str, token: str) -> dict:
+    """Column values for a new pending outbox entry"""
+    if kind not in EMAIL_KINDS:
+        raise ValueError(f"Unknown email kind: {kind}")
+    return {
+        "kind": kind,
+        "recipient": recipient,
+        "user_name": user_name,
+        "token": token,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": datetime.utcnow(),
+    }
+
+
+def enqueue_email(db, kind: str, recipient: str, user_name: str, token: str) -> EmailOutbox:
+    """Add an email to the outbox; it is sent once the caller's transaction commits"""
+    entry = EmailOutbox(**outbox_row(kind, recipient, user_name, token))
+    db.add(entry)
+    return entry
+
+
+def token_expired(now: datetime):
+    """Condition for entries whose token is no longer valid; tokens are issued with their entry"""
+    return or_(*(
+        (EmailOutbox.kind == kind) & (EmailOutbox.created_at <= now - ttl)
+        for kind, ttl in TOKEN_TTLS.items()
+    ))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff for a message that has failed `attempts` times"""
+    seconds = EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** (attempts - 1))
+    return timedelta(seconds=min(seconds, EMAIL_OUTBOX_MAX_BACKOFF_SECONDS))
+
+
+class OutboxWorker:
+    """Drains the email outbox in batches over the shared SMTP connection pool"""
+
+    def __init__(self, batch_size: int = EMAIL_OUTBOX_BATCH_SIZE, poll_seconds: float = EMAIL_OUTBOX_POLL_SECONDS):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.pool = smtp_pool
+        self._wakeup = None
+        self._task = None
+
+    def notify(self):
+        """Wake the worker so newly queued mail goes out without waiting for the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.pool.close()
+
+    async def run(self):
+        """Send due messages until cancelled"""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        while True:
+            try:
+                sent = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Email outbox worker error: {e}")
+                sent = 0
+            if sent:
+                continue
+            await self.pool.close_idle()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def claim_batch(self, db) -> list:
+        """Reserve a batch of due messages so concurrent workers don't double-send"""
+        now = datetime.utcnow()
+        claim_id = secrets.token_hex(8)
+        due = (
+            EmailOutbox.status.in_(("pending", "sending"))
+            & (EmailOutbox.next_attempt_at <= now)
+            # A link that no longer works is not worth sending; the sweeper deletes these
+            & ~token_expired(now)
+        )
+        due_ids = select(EmailOutbox.id).where(due).order_by(EmailOutbox.id).limit(self.batch_size)
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due_ids), due)
+            .values(status="sending", claim_id=claim_id, next_attempt_at=now + CLAIM_LEASE)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        entries = await db.scalars(
+            select(EmailOutbox).where(EmailOutbox.claim_id == claim_id).order_by(EmailOutbox.id)
+        )
+        return list(entries)
+
+    def build_batch(self, entries: list) -> list:
+        """Render messages for a batch, one template pass per kind"""
+        messages = [None] * len(entries)
+        for kind in EMAIL_KINDS:
+            positions = [i for i, entry in enumerate(entries) if entry.kind == kind]
+            if not positions:
+                continue
+            built = build_messages(
+                kind, [(entries[i].recipient, entries[i].user_name, entries[i].token) for i in positions]
+            )
+            for i, message in zip(positions, built):
+                messages[i] = message
+        return messages
+
+    async def drain_once(self) -> int:
+        """Send one batch of due messages and return how many went out"""
+        async with open_session() as db:
+            entries = await self.claim_batch(db)
+            if not entries:
+                return 0
+
+            messages = self.build_batch(entries)
+            # The whole batch goes out concurrently, within the pool's limits
+            errors = await self.pool.send_many([message for message in messages if message is not None])
+            errors = iter(errors)
+
+            sent = 0
+            for entry, message in zip(entries, messages):
+                error = next(errors) if message is not None else ValueError(f"Unknown email kind: {entry.kind}")
+                if error is not None:
+                    entry.attempts += 1
+                    entry.last_error = str(error)[:500]
+                    if entry.attempts >= EMAIL_OUTBOX_MAX_ATTEMPTS:
+                        entry.status = "failed"
+                        entry.token = None
+                    else:
+                        entry.status = "pending"
+                        entry.next_attempt_at = datetime.utcnow() + retry_delay(entry.attempts)
+                    print(f"Error sending {entry.kind} email to {entry.recipient}: {error}")
+                else:
+                    entry.status = "sent"
+                    entry.sent_at = datetime.utcnow()
+                    entry.token = None
+                    entry.last_error = None
+                    sent += 1
+                entry.claim_id = None
+
+            await db.commit()
+            return sent
+
+
+outbox_worker = OutboxWorker()
+
+
+async def _run_standalone():
+    try:
+        await outbox_worker.run()
+    finally:
+        await outbox_worker.pool.close()
+
+
+if __name__ == "__main__":
+    print("Starting email outbox worker")
+    asyncio.run(_run_standalone())
@@ -1,13 +1,17 @@
 import os
 import secrets
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from functools import lru_cache
+from typing import List, Tuple
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
-from dotenv import load_dotenv
+from config import load_env
+from email_templates import email_templates
+from metrics import email_send_duration_seconds, email_send_failures_total
 
 # Load environment variables
-load_dotenv()
+load_env()
 
 # Email configuration
 MAIL_USERNAME = os.getenv("MAIL_USERNAME")
@@ -19,19 +23,25 @@ MAIL_FROM_NAME = os.getenv("MAIL_FROM_NAME", "MyApp")
 MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "True").lower() == "true"
 MAIL_SSL_TLS = os.getenv("MAIL_SSL_TLS", "False").lower() == "true"
 
-# Email configuration
-conf = ConnectionConfig(
-    MAIL_USERNAME=MAIL_USERNAME,
-    MAIL_PASSWORD=MAIL_PASSWORD,
-    MAIL_FROM=MAIL_FROM,
-    MAIL_PORT=MAIL_PORT,
-    MAIL_SERVER=MAIL_SERVER,
-    MAIL_FROM_NAME=MAIL_FROM_NAME,
-    MAIL_STARTTLS=MAIL_STARTTLS,
-    MAIL_SSL_TLS=MAIL_SSL_TLS,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
+
+@lru_cache(maxsize=None)
+def get_connection_config():
+    """SMTP settings, built on first use so importing this module stays cheap"""
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=MAIL_USERNAME,
+        MAIL_PASSWORD=MAIL_PASSWORD,
+        MAIL_FROM=MAIL_FROM,
+        MAIL_PORT=MAIL_PORT,
+        MAIL_SERVER=MAIL_SERVER,
+        MAIL_FROM_NAME=MAIL_FROM_NAME,
+        MAIL_STARTTLS=MAIL_STARTTLS,
+        MAIL_SSL_TLS=MAIL_SSL_TLS,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True
+    )
+
 
 # Frontend URL for verification links
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:8081")
@@ -43,142 +53,16 @@ def generate_verification_token() -> str:
 
 
 def create_verification_email_html(user_name: str, verification_url: str) -> str:
-    """Create HTML email template for email verification"""
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Email Verification</title>
-        <style>
-            * {{
-                font-family: Consolas, 'Courier New', 'Lucida Console', Monaco, monospace;
-            }}
-            body {{
-                font-family: Consolas, 'Courier New', 'Lucida Console', Monaco, monospace;
-                line-height: 1.6;
-                color: #ECEDEE;
-                background-color: #000000;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #1e40af 0%, #3b5bdb 50%, #ff6b35 100%);
-                color: white !important;
-                padding: 30px 20px;
-                text-align: center;
-                border-radius: 12px 12px 0 0;
-            }}
-            .content {{
-                background-color: #151718;
-                padding: 30px;
-                border-radius: 0 0 12px 12px;
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                color: #ECEDEE;
-            }}
-            .button {{
-                display: inline-block;
-                background-color: #1e40af;
-                color: white !important;
-                padding: 14px 32px;
-                text-decoration: none;
-                border-radius: 12px;
-                margin: 20px 0;
-                font-weight: 500;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 30px;
-                color: #888 !important;
-                font-size: 14px;
-            }}
-            .welcome-note {{
-                background-color: rgba(30, 64, 175, 0.2);
-                border-left: 4px solid #1e40af;
-                padding: 16px;
-                margin: 20px 0;
-                border-radius: 8px;
-                color: #ECEDEE;
-            }}
-            .security-note {{
-                background-color: rgba(255, 107, 53, 0.2);
-                border-left: 4px solid #ff6b35;
-                padding: 16px;
-                margin: 20px 0;
-                border-radius: 8px;
-                color: #ECEDEE;
-            }}
-            .link-box {{
-                word-break: break-all;
-                background-color: rgba(255, 255, 255, 0.05);
-                padding: 12px;
-                border-radius: 8px;
-                color: #ECEDEE !important;
-                border: 1px solid rgba(255, 255, 255, 0.1);
-            }}
-            h1, h2 {{
-                color: #ECEDEE !important;
-            }}
-            p {{
-                color: #ECEDEE;
-                margin: 10px 0;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>Welcome to MyApp!</h1>
-        </div>
-        <div class="content">
-            <h2>Hello {user_name}!</h2>
-            <p>Thank you for signing up for MyApp! We're excited to have you on board. To complete your registration and start using all our features, please verify your email address by clicking the button below:</p>
-            
-            <div style="text-align: center;">
-                <a href="{verification_url}" class="button">Verify Email Address</a>
-            </div>
-            
-            <p>If the button doesn't work, you can also copy and paste this link:</p>
-            <p class="link-box">
-                {verification_url}
-            </p>
-            
-            <div class="welcome-note">
-                <p><strong>Welcome to MyApp!</strong> Once verified, you'll have access to all our amazing features and can start connecting with others in our community.</p>
-            </div>
-            
-            <div class="security-note">
-                <p><strong>Security Note:</strong> This verification link will expire in 24 hours for security reasons.</p>
-                <p>If you didn't create an account with MyApp, please ignore this email.</p>
-            </div>
-        </div>
-        <div class="footer">
-            <p>This email was sent by MyApp. If you have any questions, please contact our support team.</p>
-        </div>
-    </body>
-    </html>
-    """
+    """Create HTML email for email verification"""
+    return email_templates.render("verification.html", user_name=user_name, url=verification_url)
 
 
 async def send_verification_email(email: str, user_name: str, verification_token: str) -> bool:
     """Send email verification email"""
+    from smtp_pool import smtp_pool
+
     try:
-        verification_url = f"{FRONTEND_URL}/verify-email?token={verification_token}"
-        
-        # Create HTML message
-        html_body = create_verification_email_html(user_name, verification_url)
-        
-        message = MessageSchema(
-            subject="Verify Your Email Address - MyApp",
-            recipients=[email],
-            body=html_body,
-            subtype="html"
-        )
-        
-        fm = FastMail(conf)
-        await fm.send_message(message)
-        
+        await smtp_pool.send(build_verification_message(email, user_name, verification_token))
         return True
     except Exception as e:
         print(f"Error sending verification email: {e}")
@@ -186,133 +70,121 @@ async def send_verification_email(email: str, user_name: str, verification_token
 
 
 def create_password_reset_email_html(user_name: str, reset_url: str) -> str:
-    """Create HTML email template for password reset"""
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Password Reset</title>
-        <style>
-            * {{
-                font-family: Consolas, 'Courier New', 'Lucida Console', Monaco, monospace;
-            }}
-            body {{
-                font-family: Consolas, 'Courier New', 'Lucida Console', Monaco, monospace;
-                line-height: 1.6;
-                color: #ECEDEE;
-                background-color: #000000;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #1e40af 0%, #3b5bdb 50%, #ff6b35 100%);
-                color: white !important;
-                padding: 30px 20px;
-                text-align: center;
-                border-radius: 12px 12px 0 0;
-            }}
-            .content {{
-                background-color: #151718;
-                padding: 30px;
-                border-radius: 0 0 12px 12px;
-                border: 1px solid rgba(255, 255, 255, 0.1);
-                color: #ECEDEE;
-            }}
-            .button {{
-                display: inline-block;
-                background-color: #1e40af;
-                color: white !important;
-                padding: 14px 32px;
-                text-decoration: none;
-                border-radius: 12px;
-                margin: 20px 0;
-                font-weight: 500;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 30px;
-                color: #888 !important;
-                font-size: 14px;
-            }}
-            .security-note {{
-                background-color: rgba(255, 107, 53, 0.2);
-                border-left: 4px solid #ff6b35;
-                padding: 16px;
-                margin: 20px 0;
-                border-radius: 8px;
-                color: #ECEDEE;
-            }}
-            .link-box {{
-                word-break: break-all;
-                background-color: rgba(255, 255, 255, 0.05);
-                padding: 12px;
-                border-radius: 8px;
-                color: #ECEDEE !important;
-                border: 1px solid rgba(255, 255, 255, 0.1);
-            }}
-            h1, h2 {{
-                color: #ECEDEE !important;
-            }}
-            p {{
-                color: #ECEDEE;
-                margin: 10px 0;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>Password Reset Request</h1>
-        </div>
-        <div class="content">
-            <h2>Hello {user_name}!</h2>
-            <p>We received a request to reset your password for your MyApp account. If you made this request, click the button below to reset your password:</p>
-            
-            <div style="text-align: center;">
-                <a href="{reset_url}" class="button">Reset Password</a>
-            </div>
-            
-            <p>If the button doesn't work, you can also copy and paste this link:</p>
-            <p class="link-box">
-                {reset_url}
-            </p>
-            
-            <div class="security-note">
-                <p><strong>Security Note:</strong> This password reset link will expire in 1 hour for security reasons.</p>
-                <p>If you didn't request a password reset, please ignore this email. Your password will remain unchanged.</p>
-            </div>
-        </div>
-        <div class="footer">
-            <p>This email was sent by MyApp. If you have any questions, please contact our support team.</p>
-        </div>
-    </body>
-    </html>
-    """
-
-
+    """Create HTML email for password reset"""
+    return email_templates.render("password_reset.html", user_name=user_name, url=reset_url)
 
 
 async def send_password_reset_email(email: str, user_name: str, reset_token: str) -> bool:
     """Send password reset email"""
+    from smtp_pool import smtp_pool
+
     try:
-        reset_url = f"{FRONTEND_URL}/reset-password?token={reset_token}"
-        
-        # Create HTML message
-        html_body = create_password_reset_email_html(user_name, reset_url)
-        
-        message = MessageSchema(
-            subject="Reset Your Password - MyApp",
-            recipients=[email],
-            body=html_body,
-            subtype="html"
-        )
-        
-        fm = FastMail(conf)
-        await fm.send_message(message)
-        
+        await smtp_pool.send(build_password_reset_message(email, user_name, reset_token))
         return True
     except Exception as e:
         print(f"Error sending password reset email: {e}")
-        return False
\ No newline at end of file
+        return False
+
+
+def build_email_message(recipient: str, subject: str, html_body: str) -> EmailMessage:
+    """Build a MIME message ready to hand to an SMTP connection"""
+    message = EmailMessage()
+    message["From"] = formataddr((MAIL_FROM_NAME or "", str(MAIL_FROM)))
+    message["To"] = recipient
+    message["Subject"] = subject
+    message.set_content(html_body, subtype="html")
+    return message
+
+
+# Subject, template and link path for each kind of email
+EMAIL_KINDS = {
+    "verification": ("Verify Your Email Address - MyApp", "verification.html", "verify-email"),
+    "password_reset": ("Reset Your Password - MyApp", "password_reset.html", "reset-password"),
+}
+
+
+def build_messages(kind: str, recipients: List[Tuple[str, str, str]]) -> List[EmailMessage]:
+    """Build messages of one kind for many (email, user_name, token) recipients"""
+    subject, template_name, path = EMAIL_KINDS[kind]
+    bodies = email_templates.render_batch(
+        template_name,
+        ({"user_name": user_name, "url": f"{FRONTEND_URL}/{path}?token={token}"} for _, user_name, token in recipients),
+    )
+    return [
+        build_email_message(email, subject, body)
+        for (email, _, _), body in zip(recipients, bodies)
+    ]
+
+
+def build_verification_message(email: str, user_name: str, verification_token: str) -> EmailMessage:
+    """Build the email verification message"""
+    return build_messages("verification", [(email, user_name, verification_token)])[0]
+
+
+def build_password_reset_message(email: str, user_name: str, reset_token: str) -> EmailMessage:
+    """Build the password reset message"""
+    return build_messages("password_reset", [(email, user_name, reset_token)])[0]
+
+
+class SMTPConnection:
+    """A single authenticated SMTP connection that can send many messages"""
+
+    def __init__(self, config=None):
+        self._config = config
+        self._smtp = None
+        self.messages_sent = 0
+        self.last_used = 0.0
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = get_connection_config()
+        return self._config
+
+    @property
+    def is_connected(self) -> bool:
+        return self._smtp is not None and self._smtp.is_connected
+
+    async def connect(self):
+        """Open the connection and log in if it is not open already"""
+        if self.is_connected:
+            return
+        import aiosmtplib
+
+        config = self.config
+        self._smtp = aiosmtplib.SMTP(
+            hostname=config.MAIL_SERVER,
+            port=config.MAIL_PORT,
+            use_tls=config.MAIL_SSL_TLS,
+            start_tls=config.MAIL_STARTTLS,
+            validate_certs=config.VALIDATE_CERTS,
+            username=config.MAIL_USERNAME if config.USE_CREDENTIALS else None,
+            password=config.MAIL_PASSWORD.get_secret_value() if config.USE_CREDENTIALS else None,
+        )
+        await self._smtp.connect()
+        self.messages_sent = 0
+
+    async def send(self, message: EmailMessage):
+        """Send one message, connecting first if needed"""
+        start = time.perf_counter()
+        try:
+            await self.connect()
+            await self._smtp.send_message(message)
+        except Exception:
+            email_send_failures_total.inc()
+            raise
+        email_send_duration_seconds.observe(time.perf_counter() - start)
+        self.messages_sent += 1
+        self.last_used = time.monotonic()
+
+    async def close(self):
+        """Close the connection, ignoring errors from a dead socket"""
+        smtp, self._smtp = self._smtp, None
+        if smtp is None or not smtp.is_connected:
+            return
+        from aiosmtplib import SMTPException
+
+        try:
+            await smtp.quit()
+        except SMTPException:
+            smtp.close()
@@ -0,0 +1,55 @@
+import threading
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+from markupsafe import Markup
+from pathlib import Path
+from typing import Iterable, List
+
+
+# Email templates live next to this module
+TEMPLATES_DIR = Path(__file__).parent / "templates" / "email"
+STYLESHEET = "email.css"
+TEMPLATE_NAMES = ("verification.html", "password_reset.html")
+
+
+class EmailTemplateRegistry:
+    """Loads and compiles the email templates once, then renders them per send"""
+
+    def __init__(self, directory: Path = TEMPLATES_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(str(directory)),
+            autoescape=select_autoescape(["html"]),
+            undefined=StrictUndefined,
+            auto_reload=False,
+        )
+        self.directory = directory
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Read the shared stylesheet and compile every template"""
+        with self._lock:
+            if self._templates:
+                return
+            # The stylesheet is read and indented once, then shared by every render
+            css = (self.directory / STYLESHEET).read_text(encoding="utf-8")
+            indented = "\n".join(f"        {line}" if line else line for line in css.splitlines())
+            self.env.globals["styles"] = Markup(indented)
+            self._templates = {name: self.env.get_template(name) for name in TEMPLATE_NAMES}
+
+    def get(self, name: str):
+        if not self._templates:
+            self.load()
+        return self._templates[name]
+
+    def render(self, name: str, **context) -> str:
+        """Render one email body"""
+        return self.get(name).render(**context)
+
+    def render_batch(self, name: str, contexts: Iterable[dict]) -> List[str]:
+        """Render the same template for many recipients"""
+        template = self.get(name)
+        return [template.render(**context) for context in contexts]
+
+
+email_templates = EmailTemplateRegistry()
@@ -0,0 +1,138 @@
+import asyncio
+import os
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+
+from auth import get_password_hash, verify_password
+from config import load_env
+from password_policy import current_policy
+from metrics import Gauge, registry, password_hash_duration_seconds, pool_checkout_wait_seconds
+
+
+# Load environment variables
+load_env()
+
+# Hashing pool settings
+HASH_POOL_MODE = os.getenv("HASH_POOL_MODE", "thread").lower()  # "thread" or "process"
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1)))
+HASH_POOL_MAX_QUEUE = int(os.getenv("HASH_POOL_MAX_QUEUE", "64"))
+
+# Metric labels for the functions run on the pool
+OPERATION_LABELS = {get_password_hash: "hash", verify_password: "verify"}
+
+
+def _timed_call(fn, *args):
+    """Run fn in the worker and report when it started and how long it took"""
+    started = time.time()
+    result = fn(*args)
+    return started, time.time() - started, result
+
+
+class HashingPool:
+    """Bounded worker pool that keeps bcrypt work off the event loop"""
+
+    def __init__(self, mode: str = "thread", workers: int = 1, max_queue: int = 64):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown hashing pool mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Number of jobs that may be running or waiting at once"""
+        return self.workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self):
+        """Create the underlying executor if it is not running yet"""
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="hashing"
+                    )
+
+    def shutdown(self):
+        """Stop the executor, waiting for running jobs to finish"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool, rejecting with 503 when the queue is full"""
+        if self._executor is None:
+            self.start()
+
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        submitted = time.time()
+        try:
+            future = self._executor.submit(_timed_call, fn, *args)
+        except Exception:
+            self._release(None)
+            raise
+        # Release the slot when the job really finishes, even if the caller is cancelled
+        future.add_done_callback(self._release)
+        started, duration, result = await asyncio.wrap_future(future)
+        pool_checkout_wait_seconds.observe(max(0.0, started - submitted), pool="hashing")
+        password_hash_duration_seconds.observe(duration, operation=OPERATION_LABELS.get(fn, fn.__name__))
+        return result
+
+
+hashing_pool = HashingPool(HASH_POOL_MODE, HASH_POOL_WORKERS, HASH_POOL_MAX_QUEUE)
+registry.register(Gauge(
+    "hashing_pool_pending", "Hashing jobs running or queued", lambda: hashing_pool.pending))
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the hashing pool with the active policy"""
+    # Pass the policy explicitly so process workers use the parent's calibration
+    return await hashing_pool.run(get_password_hash, password, current_policy())
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash on the hashing pool"""
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def hash_passwords(passwords, concurrency: int = None) -> list:
+    """Hash many passwords for batch jobs without starving interactive requests"""
+    # Keep at most one batch job per worker on the pool; request traffic still gets the queue
+    semaphore = asyncio.Semaphore(concurrency or hashing_pool.workers)
+
+    async def hash_one(password):
+        async with semaphore:
+            while True:
+                try:
+                    return await hash_password(password)
+                except HTTPException as e:
+                    if e.status_code != status.HTTP_503_SERVICE_UNAVAILABLE:
+                        raise
+                    # Pool is full of request traffic; wait for a slot instead of failing the row
+                    await asyncio.sleep(0.05)
+
+    return await asyncio.gather(*(hash_one(password) for password in passwords))
@@ -0,0 +1,259 @@
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from fastapi import status
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
+from starlette.routing import BaseRoute, Match
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from cache import TTLCache
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Idempotency-Key settings
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "True").lower() == "true"
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory").lower()  # "memory" or "sqlite"
+IDEMPOTENCY_SQLITE_PATH = os.getenv("IDEMPOTENCY_SQLITE_PATH", "./idempotency.db")
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# How long a key stays claimed by a request that never finishes (e.g. a crashed worker)
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+
+# POST endpoints whose retries are answered from the store
+IDEMPOTENT_PATHS = ("/auth/signup", "/auth/resend-verification", "/auth/forgot-password")
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyEntry(NamedTuple):
+    """The request a key was first used with, and its response once finished"""
+    fingerprint: str
+    response: Optional[StoredResponse] = None
+
+
+class MemoryIdempotencyStore:
+    """Per-process store kept in a bounded LRU"""
+
+    def __init__(self, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self._cache = TTLCache(max_keys)
+
+    def begin(self, key: str, fingerprint: str) -> Optional[IdempotencyEntry]:
+        """Claim key for a new request; returns the existing entry if it is taken"""
+        if self._cache.add(key, IdempotencyEntry(fingerprint), ttl=IDEMPOTENCY_LOCK_SECONDS):
+            return None
+        # The claim may have expired since add() looked; treat that as still in progress
+        return self._cache.get(key) or IdempotencyEntry(fingerprint)
+
+    def finish(self, key: str, entry: IdempotencyEntry):
+        self._cache.set(key, entry, ttl=IDEMPOTENCY_TTL_SECONDS)
+
+    def release(self, key: str):
+        self._cache.pop(key)
+
+
+class SQLiteIdempotencyStore:
+    """Store shared between worker processes through a SQLite file"""
+
+    # Expired rows are deleted every this many claims
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str = IDEMPOTENCY_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._claims = itertools.count(1)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency_keys ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, status_code INTEGER, "
+                "headers TEXT, body BLOB, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def begin(self, key: str, fingerprint: str) -> Optional[IdempotencyEntry]:
+        """Claim key for a new request; returns the existing entry if it is taken"""
+        conn = self._connection()
+        now = time.time()
+        if next(self._claims) % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        # Claiming is one statement: insert, or take over a row that has expired
+        claimed = conn.execute(
+            "INSERT INTO idempotency_keys (key, fingerprint, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET fingerprint = excluded.fingerprint, status_code = NULL, "
+            "headers = NULL, body = NULL, expires_at = excluded.expires_at "
+            "WHERE idempotency_keys.expires_at <= ?",
+            (key, fingerprint, now + IDEMPOTENCY_LOCK_SECONDS, now),
+        ).rowcount
+        if claimed:
+            return None
+        row = conn.execute(
+            "SELECT fingerprint, status_code, headers, body FROM idempotency_keys WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] is None:
+            return IdempotencyEntry(fingerprint if row is None else row[0])
+        headers = [tuple(header) for header in json.loads(row[2])]
+        return IdempotencyEntry(row[0], StoredResponse(row[1], headers, row[3]))
+
+    def finish(self, key: str, entry: IdempotencyEntry):
+        response = entry.response
+        self._connection().execute(
+            "UPDATE idempotency_keys SET status_code = ?, headers = ?, body = ?, expires_at = ? WHERE key = ?",
+            (response.status_code, json.dumps(response.headers), response.body,
+             time.time() + IDEMPOTENCY_TTL_SECONDS, key),
+        )
+
+    def release(self, key: str):
+        self._connection().execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+
+
+idempotency_store = SQLiteIdempotencyStore() if IDEMPOTENCY_BACKEND == "sqlite" else MemoryIdempotencyStore()
+
+
+async def _call_store(method, *args):
+    if isinstance(idempotency_store, SQLiteIdempotencyStore):
+        return await run_in_threadpool(method, *args)
+    return method(*args)
+
+
+def is_replayable(status_code: int) -> bool:
+    """Server errors and rate limits are transient, so retries run again"""
+    return status_code < 500 and status_code != status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def stored_response(stored: StoredResponse, replayed: bool) -> Response:
+    response = Response(content=stored.body, status_code=stored.status_code)
+    response.raw_headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers]
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+class IdempotencyMiddleware:
+    """Answer retries that reuse an Idempotency-Key with the first response.
+
+    routes are the app's routes, used to label responses sent without reaching
+    the router so metrics still see the route template.
+    """
+
+    def __init__(self, app, routes: Sequence[BaseRoute] = ()):
+        self.app = app
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        # Everything but a POST to one of a few paths passes straight through
+        if (
+            not IDEMPOTENCY_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in IDEMPOTENT_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        key = Headers(scope=scope).get("idempotency-key")
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            await self._respond(scope, receive, send, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"},
+            ))
+            return
+
+        body = await _read_body(receive)
+        # The same key with a different body is a client bug, not a retry
+        fingerprint = hashlib.sha256(body).hexdigest()
+        store_key = f"{scope['path']}:{key}"
+        entry = await _call_store(idempotency_store.begin, store_key, fingerprint)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                response = JSONResponse(
+                    status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                    content={"detail": "Idempotency-Key was already used with a different request body"},
+                )
+            elif entry.response is None:
+                response = JSONResponse(
+                    status_code=status.HTTP_409_CONFLICT,
+                    content={"detail": "A request with this Idempotency-Key is still in progress"},
+                    headers={"Retry-After": "1"},
+                )
+            else:
+                response = stored_response(entry.response, replayed=True)
+            await self._respond(scope, receive, send, response)
+            return
+
+        body_sent = False
+
+        async def receive_body():
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        status_code = None
+        headers = []
+        chunks = []
+
+        async def send_and_record(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in message["headers"]]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_body, send_and_record)
+        except BaseException:
+            await _call_store(idempotency_store.release, store_key)
+            raise
+
+        if status_code is not None and is_replayable(status_code):
+            stored = StoredResponse(status_code, headers, b"".join(chunks))
+            await _call_store(idempotency_store.finish, store_key, IdempotencyEntry(fingerprint, stored))
+        else:
+            await _call_store(idempotency_store.release, store_key)
+
+    async def _respond(self, scope, receive, send, response: Response):
+        # The router never sees these requests; label them with the route it would have matched
+        for route in self.routes:
+            if route.matches(scope)[0] == Match.FULL:
+                scope["route"] = route
+                break
+        await response(scope, receive, send)
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
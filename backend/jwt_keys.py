@@ -0,0 +1,86 @@
+import json
+import os
+import secrets
+
+from datetime import datetime
+from functools import lru_cache
+from jose import jwk
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Asymmetric signing keys: one PEM private key per file, named <kid>.pem
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR", "./jwt_keys")
+# Key used for new tokens; defaults to the last kid in sort order (the newest generated key)
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID", "")
+JWKS_MAX_AGE_SECONDS = int(os.getenv("JWKS_MAX_AGE_SECONDS", "3600"))
+
+# python-jose has no EdDSA support, so RSA is the asymmetric option
+ASYMMETRIC_ALGORITHMS = ("RS256",)
+
+
+class KeySet(NamedTuple):
+    """Signing key plus every public key that tokens may still be signed with"""
+    active_kid: str
+    signing_key: jwk.Key
+    verification_keys: Dict[str, jwk.Key]
+    jwks: bytes
+
+
+@lru_cache(maxsize=None)
+def load_key_set(algorithm: str) -> KeySet:
+    """Read every key in JWT_KEYS_DIR once per process"""
+    if algorithm not in ASYMMETRIC_ALGORITHMS:
+        raise ValueError(f"Unsupported JWT algorithm for key files: {algorithm}")
+    paths = sorted(Path(JWT_KEYS_DIR).glob("*.pem"))
+    if not paths:
+        raise RuntimeError(
+            f"ALGORITHM={algorithm} needs a signing key in {JWT_KEYS_DIR}; "
+            "run `python manage.py generate-jwt-key`"
+        )
+
+    private_keys = {path.stem: jwk.construct(path.read_text(), algorithm) for path in paths}
+    active_kid = JWT_ACTIVE_KID or paths[-1].stem
+    if active_kid not in private_keys:
+        raise RuntimeError(f"JWT_ACTIVE_KID={active_kid} has no key file in {JWT_KEYS_DIR}")
+
+    verification_keys = {kid: key.public_key() for kid, key in private_keys.items()}
+    jwks = {
+        "keys": [
+            {**key.to_dict(), "kid": kid, "use": "sig"}
+            for kid, key in verification_keys.items()
+        ]
+    }
+    return KeySet(
+        active_kid=active_kid,
+        signing_key=private_keys[active_kid],
+        verification_keys=verification_keys,
+        jwks=json.dumps(jwks, separators=(",", ":")).encode("utf-8"),
+    )
+
+
+def generate_key(directory: str = JWT_KEYS_DIR) -> str:
+    """Write a new 2048-bit RSA signing key and return its kid"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    # Sorts by creation time; the suffix keeps keys made in the same microsecond apart
+    kid = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}-{secrets.token_hex(4)}"
+    path = Path(directory) / f"{kid}.pem"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pem = key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+    # Private key: readable by the app user only
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+    return kid
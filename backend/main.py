@@ -1,106 +1,215 @@
 import os
-import uvicorn
+import time
 
-from datetime import timedelta, datetime
-from dotenv import load_dotenv
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, status, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
 
-from auth import verify_password, get_password_hash, create_access_token, verify_token
-from database import get_db, engine, SessionLocal
-from models import Base, User
-from schemas import UserCreate, UserResponse, UserLogin, Token, EmailVerificationRequest, EmailVerificationResponse, VerifyEmailRequest, ForgotPasswordRequest, ForgotPasswordResponse, ResetPasswordRequest, ResetPasswordResponse
-from email_service import generate_verification_token, send_verification_email, send_password_reset_email
+from admin import router as admin_router
+from background import background_leader
+from auth import ALGORITHM, create_access_token, decode_tokens, verify_token
+from cache import user_cache, invalidate_user
+from config import load_env
+from database import dispose_inherited_connections, get_db_session
+from models import User
+from schemas import UserCreate, UserResponse, UserLogin, Token, RefreshRequest, IntrospectRequest, IntrospectResponse, EmailVerificationRequest, EmailVerificationResponse, VerifyEmailRequest, ForgotPasswordRequest, ForgotPasswordResponse, ResetPasswordRequest, ResetPasswordResponse
+from email_outbox import EMAIL_OUTBOX_WORKER, enqueue_email, outbox_worker
+from email_templates import email_templates
+from hashing_pool import hashing_pool, hash_password, check_password
+from idempotency import IdempotencyMiddleware
+from jwt_keys import ASYMMETRIC_ALGORITHMS, JWKS_MAX_AGE_SECONDS, load_key_set
+from maintenance import SWEEPER_ENABLED, sweeper
+from metrics import registry, http_requests_total, http_request_duration_seconds
+from password_policy import configure_policy, current_policy, needs_rehash
+from query_stats import QUERY_STATS_HEADERS, start_request
+from rate_limit import enforce_rate_limit, record_failure
+from session_store import create_session, rotate_session, revoke_session, revoke_user_sessions
+from token_store import VERIFICATION, PASSWORD_RESET, consume_token, issue_token, revoke_tokens, token_owner
 
 
 # Load environment variables
-load_dotenv()
+load_env()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
-# Create FastAPI app
-app = FastAPI(title="MyApp API", version="1.0.0")
+def start_background_jobs():
+    """Outbox worker and sweeper; run by one process at a time"""
+    if EMAIL_OUTBOX_WORKER:
+        outbox_worker.start()
+    if SWEEPER_ENABLED:
+        sweeper.start()
 
-# CORS middleware for React Native app
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your app's origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-
-# Database session dependency
-def get_db_session():
-    db = SessionLocal()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop per-process resources"""
+    # Runs inside each worker, so pools and caches are never shared across a fork
+    dispose_inherited_connections()
+    # Schema changes are applied by `python manage.py migrate`, not on every startup
+    email_templates.load()
+    if ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        # Fail at startup, not on the first login, if the signing keys are missing
+        key_set = load_key_set(ALGORITHM)
+        print(f"Signing {ALGORITHM} tokens with kid {key_set.active_kid}")
+    policy = await run_in_threadpool(configure_policy)
+    print(f"Password hash policy: {policy}")
+    hashing_pool.start()
+    # Under serve.py only one worker at a time polls the outbox and sweeps
+    background_leader.start(start_background_jobs)
     try:
-        yield db
+        yield
     finally:
-        db.close()
+        await sweeper.stop()
+        await outbox_worker.stop()
+        # Only hand the lock to another worker once the jobs have stopped here
+        await background_leader.stop()
+        hashing_pool.shutdown()
+
+
+class RequestMetricsMiddleware:
+    """Count and time every request by its route template.
+
+    Plain ASGI rather than @app.middleware("http"), which wraps each request in
+    an extra task and stream hand-off.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the shared scope
+            route = scope.get("route")
+            # Use the template ("/auth/me"), never the raw path, to keep label cardinality fixed
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_request_duration_seconds.observe(time.perf_counter() - start, method=method, route=path)
+            http_requests_total.inc(method=method, route=path, status=status_code)
+
 
+class QueryStatsMiddleware:
+    """Count SQL statements per request, reported in headers in debug mode"""
 
-@app.get("/")
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_request(scope["path"])
+        if not QUERY_STATS_HEADERS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_stats(message):
+            # Headers go out with the first message, so this counts the queries made before the body
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Query-Time-Ms"] = f"{stats.total_seconds * 1000:.2f}"
+            await send(message)
+
+        await self.app(scope, receive, send_with_stats)
+
+
+router = APIRouter()
+
+
+@router.get("/")
 async def root():
     return {"message": "MyApp API is running!"}
 
 
-@app.post("/auth/signup", response_model=UserResponse)
-async def signup(user: UserCreate, db: Session = Depends(get_db_session)):
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text-format metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/.well-known/jwks.json", include_in_schema=False)
+async def jwks():
+    """Public keys for verifying access tokens without calling this API"""
+    body = load_key_set(ALGORITHM).jwks if ALGORITHM in ASYMMETRIC_ALGORITHMS else b'{"keys":[]}'
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"Cache-Control": f"public, max-age={JWKS_MAX_AGE_SECONDS}"},
+    )
+
+
+@router.post("/auth/signup", response_model=UserResponse)
+async def signup(user: UserCreate, http_request: Request, db: AsyncSession = Depends(get_db_session)):
     """Create a new user account with email verification"""
+    await enforce_rate_limit(http_request, "signup")
     
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user.email).first()
-    if existing_user:
+    # Cheap index probe so known duplicates never reach the password hasher
+    if await db.scalar(select(User.id).where(User.email == user.email)) is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
+    # End the read so the hash below runs outside any transaction
+    await db.rollback()
     
-    # Generate verification token
-    verification_token = generate_verification_token()
-    
-    # Create new user (not verified initially)
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        email=user.email,
-        name=user.name,
-        hashed_password=hashed_password,
-        is_verified=False,
-        verification_token=verification_token
-    )
-    
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    # Send verification email
+    # Create new user (not verified initially); the unique index on email
+    # still decides concurrent signups that both passed the probe
+    hashed_password = await hash_password(user.password)
     try:
-        email_sent = await send_verification_email(
-            user.email, 
-            user.name, 
-            verification_token
+        db_user = await db.scalar(
+            insert(User)
+            .values(email=user.email, name=user.name, hashed_password=hashed_password, is_verified=False)
+            .returning(User)
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
         )
-        if not email_sent:
-            print(f"Warning: Failed to send verification email to {user.email}")
-    except Exception as e:
-        print(f"Error sending verification email: {e}")
-        # Don't fail signup if email sending fails
+    
+    # Generate verification token and queue the email in the same transaction
+    verification_token = issue_token(db, db_user.id, VERIFICATION)
+    enqueue_email(db, "verification", user.email, user.name, verification_token)
+    await db.commit()
+    outbox_worker.notify()
     
     return db_user
 
 
-@app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db_session)):
+@router.post("/auth/login", response_model=Token)
+async def login(user_credentials: UserLogin, http_request: Request, db: AsyncSession = Depends(get_db_session)):
     """Authenticate user and return access token"""
     from models import User
+    # The email limit is only checked here; failed attempts are counted below, successful ones never are
+    await enforce_rate_limit(http_request, "login", user_credentials.email, record_email=False)
     
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == user_credentials.email))
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    if not user or not await check_password(user_credentials.password, user.hashed_password):
+        await record_failure("login", user_credentials.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -119,17 +228,51 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db_sessio
             detail="Email not verified. Please check your email and click the verification link."
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=30)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    # Upgrade the stored hash if the policy has moved on since it was created
+    if needs_rehash(user.hashed_password, current_policy()):
+        try:
+            user.hashed_password = await hash_password(user_credentials.password)
+        except HTTPException:
+            # Hashing pool is saturated; upgrade on a later login instead
+            pass
+    
+    # Create access token (ACCESS_TOKEN_EXPIRE_MINUTES) and a session to renew it;
+    # the commit also saves an upgraded hash
+    access_token = create_access_token(data={"sub": user.email})
+    refresh_token = create_session(db, user.id)
+    await db.commit()
+    
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/auth/refresh", response_model=Token)
+async def refresh(request: RefreshRequest, db: AsyncSession = Depends(get_db_session)):
+    """Exchange a refresh token for a new access token and refresh token"""
+    rotated = await rotate_session(db, request.refresh_token)
+    # Commit either the rotation or the revocation of a replayed session
+    await db.commit()
+    
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    email, refresh_token = rotated
+    access_token = create_access_token(data={"sub": email})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+
+@router.post("/auth/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: RefreshRequest, db: AsyncSession = Depends(get_db_session)):
+    """Revoke the session behind a refresh token"""
+    await revoke_session(db, request.refresh_token)
+    await db.commit()
 
 
-@app.get("/auth/me", response_model=UserResponse)
-async def get_current_user(authorization: str = Header(None), db: Session = Depends(get_db_session)):
+@router.get("/auth/me", response_model=UserResponse)
+async def get_current_user(authorization: str = Header(None), db: AsyncSession = Depends(get_db_session)):
     """Get current user information"""
     from models import User
     
@@ -149,40 +292,76 @@ async def get_current_user(authorization: str = Header(None), db: Session = Depe
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = db.query(User).filter(User.email == email).first()
+    cached_user = user_cache.get(email)
+    if cached_user is not None:
+        return cached_user
+    
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    return user
+    user_response = UserResponse.model_validate(user)
+    user_cache.set(email, user_response)
+    return user_response
+
 
+@router.post("/auth/introspect", response_model=IntrospectResponse)
+async def introspect(request: IntrospectRequest, db: AsyncSession = Depends(get_db_session)):
+    """Validate a batch of access tokens and report their claims and user status"""
+    payloads = await decode_tokens(request.tokens)
+    emails = {payload.get("sub") for payload in payloads if payload is not None} - {None}
 
-@app.post("/auth/verify-email", response_model=EmailVerificationResponse)
-async def verify_email(request: VerifyEmailRequest, db: Session = Depends(get_db_session)):
+    users = {}
+    for email in emails:
+        cached_user = user_cache.get(email)
+        if cached_user is not None:
+            users[email] = cached_user
+    missing = emails - users.keys()
+    if missing:
+        # One query for every user not already cached
+        for user in await db.scalars(select(User).where(User.email.in_(missing))):
+            users[user.email] = UserResponse.model_validate(user)
+            user_cache.set(user.email, users[user.email])
+
+    results = []
+    for payload in payloads:
+        user = users.get(payload.get("sub")) if payload is not None else None
+        # Like RFC 7662, nothing is disclosed about tokens that are not active
+        if user is None or not user.is_active:
+            results.append({"active": False})
+        else:
+            results.append({"active": True, "claims": payload, "user": user})
+    return {"results": results}
+
+
+@router.post("/auth/verify-email", response_model=EmailVerificationResponse)
+async def verify_email(request: VerifyEmailRequest, db: AsyncSession = Depends(get_db_session)):
     """Verify user email with token"""
     from models import User
     
-    # Find user by verification token
-    user = db.query(User).filter(User.verification_token == request.token).first()
+    # Verify whoever owns the token in one conditional UPDATE
+    result = await db.execute(
+        update(User)
+        .where(User.id == token_owner(request.token, VERIFICATION), User.is_verified.is_(False))
+        .values(is_verified=True)
+        .returning(User.id, User.email)
+        .execution_options(synchronize_session=False)
+    )
+    user = result.first()
     
-    if not user:
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired verification token"
         )
     
-    if user.is_verified:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already verified"
-        )
-    
-    # Mark user as verified and clear token
-    user.is_verified = True
-    user.verification_token = None
-    db.commit()
+    # Clear the user's verification tokens
+    await revoke_tokens(db, user.id, VERIFICATION)
+    await db.commit()
+    invalidate_user(user.email)
     
     return EmailVerificationResponse(
         message="Email verified successfully! You can now log in.",
@@ -190,13 +369,14 @@ async def verify_email(request: VerifyEmailRequest, db: Session = Depends(get_db
     )
 
 
-@app.post("/auth/resend-verification", response_model=EmailVerificationResponse)
-async def resend_verification(request: EmailVerificationRequest, db: Session = Depends(get_db_session)):
+@router.post("/auth/resend-verification", response_model=EmailVerificationResponse)
+async def resend_verification(request: EmailVerificationRequest, http_request: Request, db: AsyncSession = Depends(get_db_session)):
     """Resend verification email"""
     from models import User
+    await enforce_rate_limit(http_request, "resend_verification", request.email)
     
     # Find user by email
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await db.scalar(select(User).where(User.email == request.email))
     
     if not user:
         raise HTTPException(
@@ -211,28 +391,12 @@ async def resend_verification(request: EmailVerificationRequest, db: Session = D
         )
     
     # Generate new verification token
-    verification_token = generate_verification_token()
-    user.verification_token = verification_token
-    db.commit()
+    verification_token = issue_token(db, user.id, VERIFICATION)
     
-    # Send verification email
-    try:
-        email_sent = await send_verification_email(
-            user.email, 
-            user.name, 
-            verification_token
-        )
-        if not email_sent:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to send verification email"
-            )
-    except Exception as e:
-        print(f"Error sending verification email: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to send verification email"
-        )
+    # Queue verification email
+    enqueue_email(db, "verification", user.email, user.name, verification_token)
+    await db.commit()
+    outbox_worker.notify()
     
     return EmailVerificationResponse(
         message="Verification email sent successfully!",
@@ -240,13 +404,14 @@ async def resend_verification(request: EmailVerificationRequest, db: Session = D
     )
 
 
-@app.post("/auth/forgot-password", response_model=ForgotPasswordResponse)
-async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db_session)):
+@router.post("/auth/forgot-password", response_model=ForgotPasswordResponse)
+async def forgot_password(request: ForgotPasswordRequest, http_request: Request, db: AsyncSession = Depends(get_db_session)):
     """Send password reset email"""
     from models import User
+    await enforce_rate_limit(http_request, "forgot_password", request.email)
     
     # Find user by email
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await db.scalar(select(User).where(User.email == request.email))
     
     if not user:
         # Don't reveal if user exists or not for security
@@ -262,24 +427,13 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
             email=request.email
         )
     
-    # Generate password reset token
-    reset_token = generate_verification_token()
-    user.password_reset_token = reset_token
-    user.password_reset_expires = datetime.utcnow() + timedelta(hours=1)  # 1 hour expiry
-    db.commit()
+    # Generate password reset token (1 hour expiry)
+    reset_token = issue_token(db, user.id, PASSWORD_RESET)
     
-    # Send password reset email
-    try:
-        email_sent = await send_password_reset_email(
-            user.email, 
-            user.name, 
-            reset_token
-        )
-        if not email_sent:
-            print(f"Warning: Failed to send password reset email to {user.email}")
-    except Exception as e:
-        print(f"Error sending password reset email: {e}")
-        # Don't fail the request if email sending fails
+    # Queue password reset email
+    enqueue_email(db, "password_reset", user.email, user.name, reset_token)
+    await db.commit()
+    outbox_worker.notify()
     
     return ForgotPasswordResponse(
         message="If an account with that email exists, we've sent a password reset link.",
@@ -287,49 +441,105 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
     )
 
 
-@app.post("/auth/reset-password", response_model=ResetPasswordResponse)
-async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db_session)):
+@router.post("/auth/reset-password", response_model=ResetPasswordResponse)
+async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depends(get_db_session)):
     """Reset user password with token"""
     from models import User
     
-    # Find user by reset token
-    user = db.query(User).filter(User.password_reset_token == request.token).first()
-    
-    if not user:
+    # Reject unknown or expired tokens before paying for a password hash
+    if await db.scalar(select(token_owner(request.token, PASSWORD_RESET))) is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired reset token"
         )
+    # End the read so the hash below runs outside any transaction
+    await db.rollback()
     
-    # Check if token is expired
-    if user.password_reset_expires and user.password_reset_expires < datetime.utcnow():
+    hashed_password = await hash_password(request.new_password)
+    
+    # Use up the token (and any other reset tokens of its user) atomically
+    user_id = await consume_token(db, request.token, PASSWORD_RESET)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Reset token has expired"
+            detail="Invalid or expired reset token"
         )
     
-    # Update password and clear reset token
-    user.hashed_password = get_password_hash(request.new_password)
-    user.password_reset_token = None
-    user.password_reset_expires = None
-    db.commit()
+    email = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(hashed_password=hashed_password)
+        .returning(User.email)
+        .execution_options(synchronize_session=False)
+    )
+    # Sign out every device that knew the old password
+    await revoke_user_sessions(db, user_id)
+    await db.commit()
+    invalidate_user(email)
     
     return ResetPasswordResponse(
         message="Password reset successfully! You can now log in with your new password."
     )
 
 
+def create_app() -> FastAPI:
+    """Build the ASGI app; per-process resources start in its lifespan"""
+    # Keep FastAPI's default response class: it renders response_model routes
+    # straight to JSON bytes with pydantic-core, and a custom class turns that off
+    app = FastAPI(title="MyApp API", version="1.0.0", lifespan=lifespan)
+    
+    # Each add_middleware() wraps the ones before it. Idempotency is innermost,
+    # so replayed responses are still counted and timed
+    app.add_middleware(IdempotencyMiddleware, routes=router.routes)
+    app.add_middleware(RequestMetricsMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+    # CORS middleware for React Native app; outermost, so every response gets the
+    # headers for its own request, replays and middleware errors included
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, specify your app's origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    app.include_router(router)
+    # Admin endpoints, gated by ADMIN_API_KEY
+    app.include_router(admin_router)
+    return app
+
+
+def __getattr__(name: str):
+    # Keep `uvicorn main:app` working without building the app on import
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":    
+    import asyncio
+    import uvicorn
+    from pathlib import Path
+    from jwt_keys import JWT_KEYS_DIR, generate_key
+    from manage import migrate
+    
     # Get configuration from environment
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    debug = os.getenv("DEBUG", "True").lower() == "true"
+    debug = os.getenv("DEBUG", "False").lower() == "true"
+    
+    # Development convenience: bring the schema up to date before serving
+    asyncio.run(migrate())
+    if ALGORITHM in ASYMMETRIC_ALGORITHMS and not any(Path(JWT_KEYS_DIR).glob("*.pem")):
+        print(f"Generated JWT signing key {generate_key()} in {JWT_KEYS_DIR}")
     
     print(f"Starting FastAPI server on {host}:{port}")
     print(f"Debug mode: {debug}")
     
     uvicorn.run(
-        "main:app",
+        "main:create_app",
+        factory=True,
         host=host,
         port=port,
         reload=debug,
@@ -0,0 +1,250 @@
+import asyncio
+import os
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, or_, select, update
+
+from cache import invalidate_user
+from config import load_env
+from database import open_session
+from email_outbox import EMAIL_OUTBOX_RETENTION_HOURS, token_expired
+from metrics import sweeper_rows_removed_total
+from models import AuthToken, EmailOutbox, User, UserSession
+from token_store import PASSWORD_RESET, TOKEN_TTLS, VERIFICATION, hash_token
+
+
+# Load environment variables
+load_env()
+
+# Sweeper settings
+SWEEPER_ENABLED = os.getenv("SWEEPER_ENABLED", "True").lower() == "true"
+SWEEPER_INTERVAL_SECONDS = float(os.getenv("SWEEPER_INTERVAL_SECONDS", "3600"))
+SWEEPER_BATCH_SIZE = int(os.getenv("SWEEPER_BATCH_SIZE", "500"))
+SWEEPER_MAX_BATCHES = int(os.getenv("SWEEPER_MAX_BATCHES", "100"))
+# Unverified accounts older than this are deleted; 0 keeps them forever
+UNVERIFIED_ACCOUNT_TTL_HOURS = float(os.getenv("UNVERIFIED_ACCOUNT_TTL_HOURS", "168"))
+
+
+async def delete_expired_tokens(db, now: datetime, batch_size: int) -> int:
+    """Delete one batch of expired auth tokens"""
+    expired = select(AuthToken.token_hash).where(AuthToken.expires_at < now).limit(batch_size)
+    result = await db.execute(
+        delete(AuthToken)
+        .where(AuthToken.token_hash.in_(expired))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def delete_expired_sessions(db, now: datetime, batch_size: int) -> int:
+    """Delete one batch of sessions whose refresh tokens have expired"""
+    expired = select(UserSession.id).where(UserSession.expires_at < now).limit(batch_size)
+    result = await db.execute(
+        delete(UserSession)
+        .where(UserSession.id.in_(expired))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def clear_legacy_reset_tokens(db, now: datetime, batch_size: int) -> int:
+    """Null one batch of expired reset tokens left in the old users columns"""
+    expired = select(User.id).where(User.password_reset_expires < now).limit(batch_size)
+    result = await db.execute(
+        update(User)
+        .where(User.id.in_(expired))
+        .values(password_reset_token=None, password_reset_expires=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def delete_finished_outbox_emails(db, now: datetime, batch_size: int) -> int:
+    """Delete one batch of sent or failed outbox entries older than EMAIL_OUTBOX_RETENTION_HOURS"""
+    cutoff = now - timedelta(hours=EMAIL_OUTBOX_RETENTION_HOURS)
+    finished = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status.in_(("sent", "failed")), EmailOutbox.created_at < cutoff)
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(EmailOutbox)
+        .where(EmailOutbox.id.in_(finished))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def delete_expired_outbox_emails(db, now: datetime, batch_size: int) -> int:
+    """Delete one batch of unsent outbox entries, and their raw tokens, once the token has expired"""
+    expired = (
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status.in_(("pending", "sending")), token_expired(now))
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(EmailOutbox)
+        .where(EmailOutbox.id.in_(expired))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def move_legacy_tokens(db, now: datetime, batch_size: int) -> int:
+    """Hash one batch of tokens from the old users columns into auth_tokens.
+
+    Links emailed before auth_tokens existed keep working: verification links
+    get a fresh TOKEN_TTLS window (they never expired before), reset links
+    keep their original expiry.
+    """
+    rows = (await db.execute(
+        select(
+            User.id,
+            User.is_verified,
+            User.verification_token,
+            User.password_reset_token,
+            User.password_reset_expires,
+        )
+        .where(or_(User.verification_token.is_not(None), User.password_reset_token.is_not(None)))
+        .limit(batch_size)
+    )).all()
+    if not rows:
+        return 0
+    tokens = []
+    for row in rows:
+        if row.verification_token and not row.is_verified:
+            tokens.append({
+                "token_hash": hash_token(row.verification_token),
+                "purpose": VERIFICATION,
+                "user_id": row.id,
+                "expires_at": now + TOKEN_TTLS[VERIFICATION],
+            })
+        if row.password_reset_token and row.password_reset_expires and row.password_reset_expires > now:
+            tokens.append({
+                "token_hash": hash_token(row.password_reset_token),
+                "purpose": PASSWORD_RESET,
+                "user_id": row.id,
+                "expires_at": row.password_reset_expires,
+            })
+    if tokens:
+        await db.execute(insert(AuthToken), tokens)
+    await db.execute(
+        update(User)
+        .where(User.id.in_([row.id for row in rows]))
+        .values(verification_token=None, password_reset_token=None, password_reset_expires=None)
+        .execution_options(synchronize_session=False)
+    )
+    return len(rows)
+
+
+async def delete_stale_unverified_users(db, now: datetime, batch_size: int) -> int:
+    """Delete one batch of accounts that never verified their email"""
+    cutoff = now - timedelta(hours=UNVERIFIED_ACCOUNT_TTL_HOURS)
+    rows = (await db.execute(
+        select(User.id, User.email)
+        .where(User.is_verified == False, User.created_at < cutoff)  # noqa: E712
+        .limit(batch_size)
+    )).all()
+    if not rows:
+        return 0
+    user_ids = [row.id for row in rows]
+    await db.execute(
+        delete(AuthToken)
+        .where(AuthToken.user_id.in_(user_ids))
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(User)
+        .where(User.id.in_(user_ids), User.is_verified == False)  # noqa: E712
+        .execution_options(synchronize_session=False)
+    )
+    for row in rows:
+        invalidate_user(row.email)
+    return result.rowcount
+
+
+async def sweep_in_batches(step, batch_size: int, max_batches: int) -> int:
+    """Run step until it clears less than a full batch, committing each batch"""
+    total = 0
+    for _ in range(max_batches):
+        async with open_session() as db:
+            count = await step(db, datetime.utcnow(), batch_size)
+            await db.commit()
+        total += count
+        if count < batch_size:
+            break
+        # Let request handlers in between batches
+        await asyncio.sleep(0)
+    return total
+
+
+async def sweep_once(batch_size: int = SWEEPER_BATCH_SIZE, max_batches: int = SWEEPER_MAX_BATCHES) -> dict:
+    """Run every cleanup step once and return the number of rows each touched"""
+    counts = {
+        "expired_tokens": await sweep_in_batches(delete_expired_tokens, batch_size, max_batches),
+        "expired_sessions": await sweep_in_batches(delete_expired_sessions, batch_size, max_batches),
+        "legacy_reset_tokens": await sweep_in_batches(clear_legacy_reset_tokens, batch_size, max_batches),
+        "finished_emails": await sweep_in_batches(delete_finished_outbox_emails, batch_size, max_batches),
+        "expired_emails": await sweep_in_batches(delete_expired_outbox_emails, batch_size, max_batches),
+        "unverified_users": 0,
+    }
+    if UNVERIFIED_ACCOUNT_TTL_HOURS > 0:
+        counts["unverified_users"] = await sweep_in_batches(delete_stale_unverified_users, batch_size, max_batches)
+    return counts
+
+
+class Sweeper:
+    """Periodically removes expired tokens, old outbox entries and stale unverified accounts"""
+
+    def __init__(self, interval_seconds: float = SWEEPER_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.totals = {
+            "runs": 0, "expired_tokens": 0, "expired_sessions": 0, "legacy_reset_tokens": 0,
+            "finished_emails": 0, "expired_emails": 0, "unverified_users": 0,
+        }
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self):
+        """Sweep on a fixed interval until cancelled"""
+        while True:
+            try:
+                counts = await sweep_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Sweeper error: {e}")
+            else:
+                self.totals["runs"] += 1
+                for name, count in counts.items():
+                    self.totals[name] += count
+                    sweeper_rows_removed_total.inc(count, kind=name)
+                print(
+                    "Sweeper removed "
+                    f"{counts['expired_tokens']} expired tokens, "
+                    f"{counts['expired_sessions']} expired sessions, "
+                    f"{counts['legacy_reset_tokens']} legacy reset tokens, "
+                    f"{counts['finished_emails']} sent or failed emails, "
+                    f"{counts['expired_emails']} unsent emails with expired tokens, "
+                    f"{counts['unverified_users']} unverified accounts"
+                )
+            await asyncio.sleep(self.interval_seconds)
+
+
+sweeper = Sweeper()
+
+
+if __name__ == "__main__":
+    print(asyncio.run(sweep_once()))
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import sys
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+
+async def migrate():
+    """Create any missing tables and move legacy tokens into auth_tokens"""
+    from database import create_tables, engine
+    from maintenance import SWEEPER_BATCH_SIZE, move_legacy_tokens, sweep_in_batches
+    from models import Base
+
+    await create_tables(Base.metadata)
+    print(f"✅ Database schema is up to date ({engine.url.render_as_string(hide_password=True)})")
+    moved = await sweep_in_batches(move_legacy_tokens, SWEEPER_BATCH_SIZE, max_batches=sys.maxsize)
+    if moved:
+        print(f"✅ Moved legacy tokens for {moved} users into auth_tokens")
+
+
+async def generate_jwt_key():
+    """Add a new RS256 signing key to JWT_KEYS_DIR"""
+    from jwt_keys import JWT_KEYS_DIR, generate_key
+
+    kid = generate_key()
+    print(f"✅ Generated signing key {kid} in {JWT_KEYS_DIR}")
+    print("It is published in /.well-known/jwks.json and becomes the signing key unless JWT_ACTIVE_KID is set")
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "generate-jwt-key": generate_jwt_key,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MyApp backend management commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+    asyncio.run(COMMANDS[args.command]())
@@ -0,0 +1,146 @@
+import bcrypt
+import os
+import statistics
+import time
+
+from typing import NamedTuple, Optional
+
+try:
+    import argon2
+    from argon2.low_level import Type as Argon2Type
+except ImportError:  # argon2-cffi is only needed for the argon2id scheme
+    argon2 = None
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Password hashing policy settings
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt").lower()  # "bcrypt" or "argon2id"
+PASSWORD_HASH_CALIBRATE = os.getenv("PASSWORD_HASH_CALIBRATE", "True").lower() == "true"
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "12"))
+BCRYPT_MAX_ROUNDS = 16
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MIN_TIME_COST = 2
+ARGON2_MAX_TIME_COST = 10
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+CALIBRATION_PASSWORD = b"calibration-password"
+CALIBRATION_BCRYPT_ROUNDS = 8
+
+
+class HashPolicy(NamedTuple):
+    """Scheme and work factors used for new password hashes"""
+    scheme: str = "bcrypt"
+    bcrypt_rounds: int = BCRYPT_ROUNDS
+    argon2_time_cost: int = ARGON2_TIME_COST
+    argon2_memory_cost: int = ARGON2_MEMORY_COST
+    argon2_parallelism: int = ARGON2_PARALLELISM
+
+
+def _argon2_hasher(policy: HashPolicy):
+    if argon2 is None:
+        raise RuntimeError("PASSWORD_HASH_SCHEME=argon2id requires the argon2-cffi package")
+    return argon2.PasswordHasher(
+        time_cost=policy.argon2_time_cost,
+        memory_cost=policy.argon2_memory_cost,
+        parallelism=policy.argon2_parallelism,
+        type=Argon2Type.ID,
+    )
+
+
+def hash_with_policy(password: str, policy: HashPolicy) -> str:
+    """Hash a password with the given policy"""
+    if policy.scheme == "argon2id":
+        return _argon2_hasher(policy).hash(password)
+    salt = bcrypt.gensalt(rounds=policy.bcrypt_rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_hash(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a bcrypt or argon2id hash"""
+    if hashed_password.startswith("$argon2"):
+        if argon2 is None:
+            raise RuntimeError("Verifying argon2 hashes requires the argon2-cffi package")
+        try:
+            return argon2.PasswordHasher().verify(hashed_password, plain_password)
+        except argon2.exceptions.VerificationError:
+            return False
+        except argon2.exceptions.InvalidHashError:
+            return False
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def needs_rehash(hashed_password: str, policy: HashPolicy) -> bool:
+    """Whether a stored hash uses another scheme or weaker work factors than the policy"""
+    if hashed_password.startswith("$argon2id$"):
+        if policy.scheme != "argon2id":
+            return True
+        params = argon2.extract_parameters(hashed_password)
+        return (
+            params.time_cost < policy.argon2_time_cost
+            or params.memory_cost < policy.argon2_memory_cost
+        )
+    if hashed_password.startswith("$2"):
+        if policy.scheme != "bcrypt":
+            return True
+        try:
+            rounds = int(hashed_password.split("$")[2])
+        except (IndexError, ValueError):
+            return True
+        return rounds < policy.bcrypt_rounds
+    return True
+
+
+def _median_ms(fn, samples: int = 3) -> float:
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target_ms: float) -> HashPolicy:
+    """Pick the strongest work factor that stays within target_ms on this machine"""
+    if scheme == "argon2id":
+        base = HashPolicy(scheme="argon2id", argon2_time_cost=1)
+        hasher = _argon2_hasher(base)
+        per_pass = _median_ms(lambda: hasher.hash(CALIBRATION_PASSWORD))
+        time_cost = int(target_ms // per_pass) if per_pass > 0 else ARGON2_MAX_TIME_COST
+        time_cost = max(ARGON2_MIN_TIME_COST, min(ARGON2_MAX_TIME_COST, time_cost))
+        return base._replace(argon2_time_cost=time_cost)
+
+    # Each extra bcrypt round doubles the cost, so time a cheap cost and extrapolate
+    probe_ms = _median_ms(lambda: bcrypt.hashpw(CALIBRATION_PASSWORD, bcrypt.gensalt(rounds=CALIBRATION_BCRYPT_ROUNDS)))
+    rounds = BCRYPT_MIN_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and probe_ms * 2 ** (rounds + 1 - CALIBRATION_BCRYPT_ROUNDS) <= target_ms:
+        rounds += 1
+    return HashPolicy(scheme="bcrypt", bcrypt_rounds=rounds)
+
+
+_current_policy: Optional[HashPolicy] = None
+
+
+def configure_policy() -> HashPolicy:
+    """Set the policy for new hashes, calibrating to the current hardware if enabled"""
+    global _current_policy
+    if PASSWORD_HASH_SCHEME not in ("bcrypt", "argon2id"):
+        raise ValueError(f"Unknown password hash scheme: {PASSWORD_HASH_SCHEME}")
+    if PASSWORD_HASH_CALIBRATE:
+        _current_policy = calibrate(PASSWORD_HASH_SCHEME, PASSWORD_HASH_TARGET_MS)
+    else:
+        _current_policy = HashPolicy(scheme=PASSWORD_HASH_SCHEME)
+    return _current_policy
+
+
+def current_policy() -> HashPolicy:
+    """The active policy; uncalibrated defaults until configure_policy() runs"""
+    if _current_policy is None:
+        return HashPolicy(scheme=PASSWORD_HASH_SCHEME)
+    return _current_policy
@@ -0,0 +1,69 @@
+import logging
+import os
+import time
+
+from contextvars import ContextVar
+from sqlalchemy import event
+from typing import Optional
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Attach per-request query counts to responses in debug mode
+QUERY_STATS_HEADERS = os.getenv("DEBUG", "False").lower() == "true"
+# Statements slower than this are written to the slow-query log; 0 disables it
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+slow_query_logger = logging.getLogger("myapp.slow_query")
+
+
+class QueryStats:
+    """SQL statements issued while handling one request"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self.total_seconds = 0.0
+
+
+# Stats for the request being handled in the current context, if any
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def start_request(path: str) -> QueryStats:
+    """Begin collecting query stats for a request"""
+    stats = QueryStats(path)
+    current_query_stats.set(stats)
+    return stats
+
+
+def instrument_query_stats(engine):
+    """Count statements per request and log slow ones with the request path"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_stats_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_stats_start"].pop()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.total_seconds += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            slow_query_logger.warning(
+                "Slow query (%.1f ms) during %s: %s",
+                elapsed * 1000,
+                stats.path if stats is not None else "background task",
+                " ".join(statement.split()),
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        starts = context.connection.info.get("query_stats_start") if context.connection else None
+        if starts:
+            starts.pop()
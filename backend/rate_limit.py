@@ -0,0 +1,216 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Optional, Tuple
+
+from config import load_env
+
+
+# Load environment variables
+load_env()
+
+# Rate limiter settings
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()  # "memory" or "sqlite"
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", "./rate_limits.db")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "False").lower() == "true"
+# Proxies of our own that append to X-Forwarded-For; the client is the entry the outermost one added
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "1"))
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """Parse a "count/seconds" limit such as "10/60" """
+    count, _, seconds = value.partition("/")
+    return int(count), float(seconds or "60")
+
+
+# Limits per endpoint scope, as (requests, window seconds)
+RATE_LIMITS = {
+    "login:ip": parse_limit(os.getenv("RATE_LIMIT_LOGIN_IP", "20/60")),
+    "login:email": parse_limit(os.getenv("RATE_LIMIT_LOGIN_EMAIL", "5/60")),
+    "signup:ip": parse_limit(os.getenv("RATE_LIMIT_SIGNUP_IP", "5/60")),
+    "forgot_password:ip": parse_limit(os.getenv("RATE_LIMIT_FORGOT_PASSWORD_IP", "5/60")),
+    "forgot_password:email": parse_limit(os.getenv("RATE_LIMIT_FORGOT_PASSWORD_EMAIL", "3/3600")),
+    "resend_verification:ip": parse_limit(os.getenv("RATE_LIMIT_RESEND_VERIFICATION_IP", "5/60")),
+    "resend_verification:email": parse_limit(os.getenv("RATE_LIMIT_RESEND_VERIFICATION_EMAIL", "3/3600")),
+}
+
+
+def sliding_window(state: Optional[Tuple[int, int, int]], now: float, limit: int, window: float):
+    """Sliding-window counter step.
+
+    state is (window index, hits in that window, hits in the previous window).
+    Returns (new state or None if unchanged, seconds to wait or 0 if allowed).
+    """
+    index = int(now // window)
+    if state is None or state[0] < index - 1:
+        current, previous = 0, 0
+    elif state[0] == index - 1:
+        current, previous = 0, state[1]
+    else:
+        current, previous = state[1], state[2]
+
+    # Weight the previous window by how much of it still overlaps the sliding window
+    overlap = 1 - (now - index * window) / window
+    if previous * overlap + current >= limit:
+        if current >= limit or previous == 0:
+            retry_after = (index + 1) * window - now
+        else:
+            # Wait until enough of the previous window has slid out
+            retry_after = (previous * overlap + current - limit + 1) / previous * window
+        return None, max(retry_after, 1.0)
+    return (index, current + 1, previous), 0.0
+
+
+class MemoryRateLimiter:
+    """Per-process sliding-window limiter kept in a plain dict"""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._state: Dict[str, Tuple[int, int, int]] = {}
+        self._windows: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: float, record: bool = True) -> float:
+        """Record a hit for key (or only check it); returns 0 if allowed, else seconds to wait"""
+        now = time.time()
+        with self._lock:
+            new_state, retry_after = sliding_window(self._state.get(key), now, limit, window)
+            if new_state is not None and record:
+                if key not in self._state and len(self._state) >= self.max_keys:
+                    self._prune(now)
+                self._state[key] = new_state
+                self._windows[key] = window
+            return retry_after
+
+    def _prune(self, now: float):
+        """Drop keys whose windows no longer affect any decision"""
+        stale = [
+            key for key, (index, _, _) in self._state.items()
+            if index < int(now // self._windows[key]) - 1
+        ]
+        if not stale:
+            # Everything is live; evict the oldest insertions instead of growing without bound
+            stale = list(self._state)[: max(1, self.max_keys // 10)]
+        for key in stale:
+            del self._state[key]
+            del self._windows[key]
+
+    def reset(self):
+        with self._lock:
+            self._state.clear()
+            self._windows.clear()
+
+
+class SQLiteRateLimiter:
+    """Sliding-window limiter shared between worker processes through a SQLite file"""
+
+    def __init__(self, path: str = RATE_LIMIT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, "
+                "current INTEGER NOT NULL, previous INTEGER NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, limit: int, window: float, record: bool = True) -> float:
+        """Record a hit for key (or only check it); returns 0 if allowed, else seconds to wait"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_index, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            new_state, retry_after = sliding_window(row, time.time(), limit, window)
+            if new_state is not None and record:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, window_index, current, previous) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET window_index = excluded.window_index, "
+                    "current = excluded.current, previous = excluded.previous",
+                    (key, *new_state),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+rate_limiter = SQLiteRateLimiter() if RATE_LIMIT_BACKEND == "sqlite" else MemoryRateLimiter()
+
+
+def forwarded_client(forwarded: str, trusted_proxies: int) -> str:
+    """Client address from X-Forwarded-For, skipping entries a client could have forged.
+
+    Each proxy appends the address it received the request from, so only the
+    last trusted_proxies entries were written by our own infrastructure.
+    """
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    if not hops:
+        return ""
+    return hops[-min(max(1, trusted_proxies), len(hops))]
+
+
+def client_ip(request: Request) -> str:
+    """Best-effort client address for rate limiting"""
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = forwarded_client(request.headers.get("x-forwarded-for", ""), RATE_LIMIT_TRUSTED_PROXIES)
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else "unknown"
+
+
+async def _hit(key: str, limit: int, window: float, record: bool = True) -> float:
+    if isinstance(rate_limiter, SQLiteRateLimiter):
+        return await run_in_threadpool(rate_limiter.hit, key, limit, window, record)
+    return rate_limiter.hit(key, limit, window, record)
+
+
+async def enforce_rate_limit(request: Request, scope: str, email: Optional[str] = None, record_email: bool = True):
+    """Reject the request with 429 if its IP or email is over the scope's limit.
+
+    With record_email=False the email limit is only checked, not counted;
+    call record_failure() for the attempts that should count against it.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    checks = [(f"{scope}:ip", client_ip(request), True)]
+    if email is not None:
+        checks.append((f"{scope}:email", email.lower(), record_email))
+
+    for name, value, record in checks:
+        if name not in RATE_LIMITS:
+            continue
+        limit, window = RATE_LIMITS[name]
+        retry_after = await _hit(f"{name}:{value}", limit, window, record)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+
+async def record_failure(scope: str, email: str):
+    """Count a failed attempt against the scope's per-email limit"""
+    name = f"{scope}:email"
+    if not RATE_LIMIT_ENABLED or name not in RATE_LIMITS:
+        return
+    limit, window = RATE_LIMITS[name]
+    await _hit(f"{name}:{email.lower()}", limit, window)
@@ -1,6 +1,8 @@
 from datetime import datetime
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, Dict, List, Optional
+
+from auth import INTROSPECT_MAX_TOKENS
 
 
 class UserBase(BaseModel):
@@ -40,6 +42,11 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
@@ -84,4 +91,40 @@ class ResetPasswordRequest(BaseModel):
 
 
 class ResetPasswordResponse(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+
+
+class ImportRowError(BaseModel):
+    line: int
+    email: Optional[str] = None
+    error: str
+
+
+class ImportResponse(BaseModel):
+    processed: int
+    created: int
+    skipped: int
+    failed: int
+    elapsed_seconds: float
+    errors: List[ImportRowError]
+    errors_truncated: bool
+
+
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_after_id: Optional[int] = None
+
+
+class IntrospectRequest(BaseModel):
+    # Rejected with a 422 before any token is decoded
+    tokens: List[str] = Field(..., max_length=INTROSPECT_MAX_TOKENS)
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    claims: Optional[Dict[str, Any]] = None
+    user: Optional[UserResponse] = None
+
+
+class IntrospectResponse(BaseModel):
+    results: List[TokenIntrospection]
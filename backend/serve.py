@@ -0,0 +1,101 @@
+import argparse
+import importlib.util
+import inspect
+import os
+import tempfile
+
+import uvicorn
+
+from cache import USER_CACHE_TTL_SECONDS
+from config import load_env
+from password_policy import PASSWORD_HASH_CALIBRATE, configure_policy
+
+
+# Load environment variables
+load_env()
+
+# Production server settings
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))  # 0 = one per CPU core
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "10000"))  # 0 = never recycle workers
+SERVER_MAX_REQUESTS_JITTER = int(os.getenv("SERVER_MAX_REQUESTS_JITTER", "1000"))
+SERVER_GRACEFUL_TIMEOUT = float(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+SERVER_KEEP_ALIVE = float(os.getenv("SERVER_KEEP_ALIVE", "5"))
+SERVER_LOG_LEVEL = os.getenv("SERVER_LOG_LEVEL", "info")
+
+
+def pick_implementation(module: str, fast: str, fallback: str) -> str:
+    """Use the faster uvicorn backend when its package is installed"""
+    return fast if importlib.util.find_spec(module) is not None else fallback
+
+
+def server_options(workers: int) -> dict:
+    """uvicorn.run() keyword arguments for a production deployment"""
+    options = {
+        "host": HOST,
+        "port": PORT,
+        "factory": True,
+        "workers": workers,
+        "loop": pick_implementation("uvloop", "uvloop", "asyncio"),
+        "http": pick_implementation("httptools", "httptools", "h11"),
+        "timeout_graceful_shutdown": SERVER_GRACEFUL_TIMEOUT,
+        "timeout_keep_alive": SERVER_KEEP_ALIVE,
+        "log_level": SERVER_LOG_LEVEL,
+    }
+    if SERVER_MAX_REQUESTS > 0:
+        options["limit_max_requests"] = SERVER_MAX_REQUESTS
+        # Stagger restarts so workers do not all recycle at the same moment
+        if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+            options["limit_max_requests_jitter"] = SERVER_MAX_REQUESTS_JITTER
+    return options
+
+
+def calibrate_once():
+    """Calibrate here so every worker, including recycled ones, hashes with the same work factor"""
+    if not PASSWORD_HASH_CALIBRATE:
+        return
+    policy = configure_policy()
+    os.environ.update({
+        "PASSWORD_HASH_CALIBRATE": "False",
+        "BCRYPT_ROUNDS": str(policy.bcrypt_rounds),
+        "ARGON2_TIME_COST": str(policy.argon2_time_cost),
+    })
+    print(f"Calibrated password hash policy: {policy}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes")
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="worker processes (0 = CPU count)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers = args.workers if args.workers > 0 else cpus
+    # Each worker has its own hashing pool; split the cores instead of oversubscribing them
+    os.environ.setdefault("HASH_POOL_WORKERS", str(max(1, cpus // workers)))
+    if workers > 1:
+        # One worker at a time runs the outbox worker and sweeper
+        os.environ.setdefault("BACKGROUND_LOCK_PATH", os.path.join(tempfile.gettempdir(), f"myapp-background-{PORT}.lock"))
+        # /metrics only sees the worker that answers the scrape
+        os.environ.setdefault("METRICS_PID_LABEL", "True")
+        if USER_CACHE_TTL_SECONDS > 0:
+            print("Warning: user_cache is per worker; other workers may serve a changed user for up to USER_CACHE_TTL_SECONDS")
+    if workers > 1 and os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true" \
+            and os.getenv("RATE_LIMIT_BACKEND", "memory").lower() == "memory":
+        print("Warning: RATE_LIMIT_BACKEND=memory keeps separate limits per worker; use sqlite to share them")
+    if workers > 1 and os.getenv("IDEMPOTENCY_ENABLED", "True").lower() == "true" \
+            and os.getenv("IDEMPOTENCY_BACKEND", "memory").lower() == "memory":
+        print("Warning: IDEMPOTENCY_BACKEND=memory only replays retries that reach the same worker; use sqlite to share keys")
+
+    calibrate_once()
+    options = server_options(workers)
+    print(
+        f"Serving on {HOST}:{PORT} with {workers} workers "
+        f"(loop={options['loop']}, http={options['http']}, "
+        f"hashing threads per worker={os.environ['HASH_POOL_WORKERS']})"
+    )
+    uvicorn.run("main:create_app", **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import secrets
+
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from typing import Optional, Tuple
+
+from config import load_env
+from models import User, UserSession
+from token_store import hash_token
+
+
+# Load environment variables
+load_env()
+
+# Refresh tokens stop working this long after login, however often they rotate
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+
+
+def create_session(db, user_id: int) -> str:
+    """Start a session for a user and return its first refresh token"""
+    refresh_token = secrets.token_urlsafe(32)
+    db.add(UserSession(
+        user_id=user_id,
+        refresh_token_hash=hash_token(refresh_token),
+        expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return refresh_token
+
+
+async def rotate_session(db, refresh_token: str) -> Optional[Tuple[str, str]]:
+    """Swap a refresh token for a new one; returns (email, new refresh token) or None"""
+    now = datetime.utcnow()
+    token_hash = hash_token(refresh_token)
+    row = (await db.execute(
+        select(UserSession.id, UserSession.expires_at, UserSession.revoked_at, User.email, User.is_active)
+        .join(User, User.id == UserSession.user_id)
+        .where(UserSession.refresh_token_hash == token_hash)
+    )).first()
+
+    if row is None:
+        # A rotated-out token being replayed means it leaked; end that session
+        await db.execute(
+            update(UserSession)
+            .where(UserSession.previous_token_hash == token_hash, UserSession.revoked_at.is_(None))
+            .values(revoked_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        return None
+    if row.revoked_at is not None or row.expires_at < now or not row.is_active:
+        return None
+
+    new_token = secrets.token_urlsafe(32)
+    result = await db.execute(
+        update(UserSession)
+        # Only the first of two concurrent refreshes with the same token wins
+        .where(UserSession.id == row.id, UserSession.refresh_token_hash == token_hash)
+        .values(refresh_token_hash=hash_token(new_token), previous_token_hash=token_hash, last_used_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+    return row.email, new_token
+
+
+async def revoke_session(db, refresh_token: str) -> bool:
+    """Revoke the session a refresh token belongs to"""
+    result = await db.execute(
+        update(UserSession)
+        .where(UserSession.refresh_token_hash == hash_token(refresh_token), UserSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+async def revoke_user_sessions(db, user_id: int):
+    """Revoke every active session of a user, e.g. after a password reset"""
+    await db.execute(
+        update(UserSession)
+        .where(UserSession.user_id == user_id, UserSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import time
+
+from contextlib import asynccontextmanager
+from email.message import EmailMessage
+from email.utils import parseaddr
+from typing import Dict, List, Optional
+
+from config import load_env
+from email_service import SMTPConnection
+from metrics import Gauge, registry, pool_checkout_wait_seconds
+
+
+# Load environment variables
+load_env()
+
+# SMTP delivery settings
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))  # connections, and so messages in flight
+SMTP_PER_DOMAIN_CONCURRENCY = int(os.getenv("SMTP_PER_DOMAIN_CONCURRENCY", "2"))
+SMTP_MAX_MESSAGES_PER_SECOND = float(os.getenv("SMTP_MAX_MESSAGES_PER_SECOND", "0"))  # 0 = unlimited
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
+
+
+def recipient_domain(message: EmailMessage) -> str:
+    return parseaddr(str(message["To"]))[1].rpartition("@")[2].lower()
+
+
+def _is_disconnect(error: Exception) -> bool:
+    """Errors that mean a pooled connection went stale rather than the message was refused"""
+    from aiosmtplib import SMTPServerDisconnected
+
+    return isinstance(error, (SMTPServerDisconnected, ConnectionError))
+
+
+class SMTPPool:
+    """Persistent SMTP connections shared by concurrent senders.
+
+    Every send waits for a slot for its recipient domain, then for a free
+    connection, so callers slow down instead of exceeding the provider's
+    limits. Connections are reused until they fail, go idle or reach
+    SMTP_MAX_MESSAGES_PER_CONNECTION.
+    """
+
+    def __init__(
+        self,
+        size: int = SMTP_POOL_SIZE,
+        per_domain: int = SMTP_PER_DOMAIN_CONCURRENCY,
+        max_per_second: float = SMTP_MAX_MESSAGES_PER_SECOND,
+        config=None,
+    ):
+        self.size = max(1, size)
+        self.per_domain = max(1, per_domain)
+        self.max_per_second = max_per_second
+        self.connections = [SMTPConnection(config) for _ in range(self.size)]
+        self._idle = None
+        self._domain_active: Dict[str, int] = {}
+        self._domain_changed = None
+        self._next_send_at = 0.0
+        self._pace_lock = None
+
+    @property
+    def in_flight(self) -> int:
+        return sum(self._domain_active.values())
+
+    def _ensure_started(self):
+        # Created lazily so they bind to the running event loop
+        if self._idle is None:
+            # LIFO keeps reusing the warmest connections and lets the rest go idle
+            self._idle = asyncio.LifoQueue()
+            for connection in self.connections:
+                self._idle.put_nowait(connection)
+            self._domain_changed = asyncio.Condition()
+            self._pace_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def _domain_slot(self, domain: str):
+        """Hold one of the recipient domain's concurrency slots"""
+        async with self._domain_changed:
+            await self._domain_changed.wait_for(lambda: self._domain_active.get(domain, 0) < self.per_domain)
+            self._domain_active[domain] = self._domain_active.get(domain, 0) + 1
+        try:
+            yield
+        finally:
+            async with self._domain_changed:
+                remaining = self._domain_active.pop(domain) - 1
+                if remaining:
+                    self._domain_active[domain] = remaining
+                self._domain_changed.notify_all()
+
+    async def _pace(self):
+        """Space send starts to stay under SMTP_MAX_MESSAGES_PER_SECOND"""
+        if self.max_per_second <= 0:
+            return
+        async with self._pace_lock:
+            now = time.monotonic()
+            delay = self._next_send_at - now
+            self._next_send_at = max(now, self._next_send_at) + 1 / self.max_per_second
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def send(self, message: EmailMessage):
+        """Send one message on a pooled connection, waiting for capacity if needed"""
+        self._ensure_started()
+        async with self._domain_slot(recipient_domain(message)):
+            await self._pace()
+            start = time.perf_counter()
+            connection = await self._idle.get()
+            pool_checkout_wait_seconds.observe(time.perf_counter() - start, pool="smtp")
+            try:
+                await self._send_on(connection, message)
+            finally:
+                self._idle.put_nowait(connection)
+
+    async def _send_on(self, connection: SMTPConnection, message: EmailMessage):
+        if connection.is_connected and connection.messages_sent >= SMTP_MAX_MESSAGES_PER_CONNECTION:
+            await connection.close()
+        reused = connection.is_connected
+        try:
+            await connection.send(message)
+        except Exception as e:
+            await connection.close()
+            # The server dropped an idle connection; the message never went out, so retry once
+            if not (reused and _is_disconnect(e)):
+                raise
+            try:
+                await connection.send(message)
+            except Exception:
+                await connection.close()
+                raise
+
+    async def send_many(self, messages: List[EmailMessage]) -> List[Optional[BaseException]]:
+        """Send messages concurrently; returns None or the error for each one, in order"""
+        results = await asyncio.gather(*(self.send(message) for message in messages), return_exceptions=True)
+        for result in results:
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+        return results
+
+    async def close_idle(self, idle_seconds: float = SMTP_IDLE_SECONDS):
+        """Close connections that have not sent anything for idle_seconds"""
+        if self._idle is None:
+            return
+        cutoff = time.monotonic() - idle_seconds
+        # Only look at checked-in connections; the rest are mid-send
+        idle = [self._idle.get_nowait() for _ in range(self._idle.qsize())]
+        try:
+            for connection in idle:
+                if connection.is_connected and connection.last_used < cutoff:
+                    await connection.close()
+        finally:
+            for connection in idle:
+                self._idle.put_nowait(connection)
+
+    async def close(self):
+        """Close every connection; the pool can be used again on a new event loop"""
+        for connection in self.connections:
+            await connection.close()
+        self._idle = None
+
+
+smtp_pool = SMTPPool()
+
+registry.register(Gauge(
+    "smtp_pool_in_flight", "Emails being sent or waiting for a connection", lambda: smtp_pool.in_flight))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+In-process load test for the auth API.
+
+Drives the ASGI app directly through httpx (no server, no network, no SMTP)
+with concurrent virtual users running signup -> verify -> login -> /auth/me,
+then reports throughput and p50/p95/p99 latency per route.
+
+    python tests/benchmark_api.py                  # run and compare to baseline
+    python tests/benchmark_api.py --save-baseline  # run and store a new baseline
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tests.helpers import (
+    compare_to_baseline, exit_on_regressions, isolated_env, outbox_token, percentile, save_baseline,
+)
+
+os.environ.update(isolated_env("myapp-bench-"))
+
+import httpx
+
+import main
+from database import create_tables
+from models import Base
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_baseline.json"
+PASSWORD = "benchmark-password-123"
+
+
+class Recorder:
+    """Collects per-route latencies"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, route, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[route].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+
+async def virtual_user(client, recorder, user_id, me_calls):
+    """One user's signup -> verify -> login -> /auth/me flow"""
+    email = f"bench-{user_id}@example.com"
+    await recorder.call(client, "POST /auth/signup", "POST", "/auth/signup",
+                        json={"email": email, "name": f"Bench {user_id}", "password": PASSWORD})
+    token = await outbox_token(email, "verification")
+    await recorder.call(client, "POST /auth/verify-email", "POST", "/auth/verify-email", json={"token": token})
+    response = await recorder.call(client, "POST /auth/login", "POST", "/auth/login",
+                                   json={"email": email, "password": PASSWORD})
+    access_token = response.json().get("access_token")
+    headers = {"Authorization": f"Bearer {access_token}"}
+    for _ in range(me_calls):
+        await recorder.call(client, "GET /auth/me", "GET", "/auth/me", headers=headers)
+
+
+async def run_benchmark(users, concurrency, me_calls):
+    await create_tables(Base.metadata)
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.create_app())
+
+    async def limited(user_id):
+        async with semaphore:
+            await virtual_user(client, recorder, user_id, me_calls)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(i) for i in range(users)))
+        elapsed = time.perf_counter() - start
+
+    main.hashing_pool.shutdown()
+
+    results = {}
+    for route, samples in sorted(recorder.latencies.items()):
+        results[route] = {
+            "requests": len(samples),
+            "errors": recorder.errors[route],
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        }
+    total = sum(len(samples) for samples in recorder.latencies.values())
+    return {
+        "config": {"users": users, "concurrency": concurrency, "me_calls": me_calls},
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "routes": results,
+    }
+
+
+def print_report(report):
+    print(f"Total: {report['throughput_rps']} req/s over {report['elapsed_s']}s")
+    print(f"{'route':<28}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in report["routes"].items():
+        print(f"{route:<28}{stats['requests']:>7}{stats['errors']:>6}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def p95_regressions(report, tolerance):
+    """Return the routes whose p95 regressed beyond tolerance"""
+    def regressed(route, stats, base):
+        if stats["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            return f"{route}: p95 {stats['p95_ms']}ms vs baseline {base['p95_ms']}ms"
+        return None
+
+    return compare_to_baseline(BASELINE_PATH, report, "routes", regressed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process auth API benchmark")
+    parser.add_argument("--users", type=int, default=20, help="virtual users")
+    parser.add_argument("--concurrency", type=int, default=5, help="users running at once")
+    parser.add_argument("--me-calls", type=int, default=20, help="/auth/me calls per user")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    print("Benchmarking MyApp API in-process...")
+    print("=" * 50)
+    report = asyncio.run(run_benchmark(args.users, args.concurrency, args.me_calls))
+    print_report(report)
+
+    if args.save_baseline:
+        save_baseline(BASELINE_PATH, report)
+        sys.exit(0)
+    exit_on_regressions(p95_regressions(report, args.tolerance))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Email delivery benchmark against an in-process SMTP stand-in.
+
+Renders verification and password reset emails exactly as the outbox does,
+sends them from concurrent senders through an SMTPPool pointed at a local
+aiosmtpd server, and reports messages/second and p50/p95/p99 send latency per
+kind.
+Every delivered message is checked for its recipient, subject and token URL.
+
+    python tests/benchmark_email.py                  # run and compare to baseline
+    python tests/benchmark_email.py --save-baseline  # run and store a new baseline
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tests.helpers import compare_to_baseline, exit_on_regressions, isolated_env, percentile, save_baseline
+
+os.environ.update(isolated_env("myapp-email-"))
+
+from email_service import EMAIL_KINDS, FRONTEND_URL, build_messages, generate_verification_token
+from smtp_pool import SMTPPool
+from tests.smtp_server import LocalSMTPServer, html_body
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_email_baseline.json"
+# Recipients are spread over this many domains to exercise the per-domain cap
+DOMAINS = 10
+
+
+def check_delivery(server, kind, recipients):
+    """Return a list of problems with the messages the stand-in received"""
+    subject, _, path = EMAIL_KINDS[kind]
+    delivered = {str(message["To"]): message for message in server.messages}
+    problems = []
+    for email, _, token in recipients:
+        message = delivered.get(email)
+        if message is None:
+            problems.append(f"{kind}: nothing delivered to {email}")
+        elif message["Subject"] != subject:
+            problems.append(f"{kind}: wrong subject for {email}: {message['Subject']!r}")
+        elif f"{FRONTEND_URL}/{path}?token={token}" not in html_body(message):
+            problems.append(f"{kind}: token URL missing from the email to {email}")
+    return problems
+
+
+async def run_kind(server, kind, messages, concurrency, pool_size, per_domain):
+    recipients = [
+        (f"user{i}@domain{i % DOMAINS}.example.com", f"User {i}", generate_verification_token())
+        for i in range(messages)
+    ]
+    built = build_messages(kind, recipients)
+    pool = SMTPPool(size=pool_size, per_domain=per_domain, config=server.connection_config())
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed_send(message):
+        async with semaphore:
+            # Includes any wait for a domain slot or connection, as callers see it
+            start = time.perf_counter()
+            await pool.send(message)
+            latencies.append(time.perf_counter() - start)
+
+    server.messages.clear()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(timed_send(message) for message in built), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    await pool.close()
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    problems = [f"{kind}: send failed: {error}" for error in errors[:5]]
+    problems += check_delivery(server, kind, recipients)
+    stats = {
+        "messages": messages,
+        "errors": len(errors),
+        "msgs_per_s": round(messages / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+    }
+    return stats, problems
+
+
+async def run_benchmark(messages, concurrency, pool_size, per_domain, delay_ms):
+    report = {
+        "config": {
+            "messages": messages,
+            "concurrency": concurrency,
+            "pool_size": pool_size,
+            "per_domain": per_domain,
+            "delay_ms": delay_ms,
+        },
+        "kinds": {},
+    }
+    problems = []
+    with LocalSMTPServer(delay_ms=delay_ms) as server:
+        for kind in EMAIL_KINDS:
+            report["kinds"][kind], kind_problems = await run_kind(
+                server, kind, messages, concurrency, pool_size, per_domain
+            )
+            problems += kind_problems
+    return report, problems
+
+
+def print_report(report):
+    print(f"{'kind':<16}{'msgs':>7}{'errs':>6}{'msgs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, stats in report["kinds"].items():
+        print(f"{kind:<16}{stats['messages']:>7}{stats['errors']:>6}{stats['msgs_per_s']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def throughput_regressions(report, tolerance):
+    """Return the kinds whose throughput dropped beyond tolerance"""
+    def regressed(kind, stats, base):
+        if stats["msgs_per_s"] < base["msgs_per_s"] * (1 - tolerance):
+            return f"{kind}: {stats['msgs_per_s']} msgs/s vs baseline {base['msgs_per_s']} msgs/s"
+        return None
+
+    return compare_to_baseline(BASELINE_PATH, report, "kinds", regressed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Email delivery benchmark against a local SMTP server")
+    parser.add_argument("--messages", type=int, default=500, help="messages per email kind")
+    parser.add_argument("--concurrency", type=int, default=16, help="senders running at once")
+    parser.add_argument("--pool-size", type=int, default=4, help="SMTP connections")
+    parser.add_argument("--per-domain", type=int, default=2, help="concurrent sends per recipient domain")
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="time the stand-in takes to accept a message")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput drop (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    print("Benchmarking email delivery against a local SMTP server...")
+    print("=" * 50)
+    report, problems = asyncio.run(run_benchmark(
+        args.messages, args.concurrency, args.pool_size, args.per_domain, args.delay_ms
+    ))
+    print_report(report)
+
+    if problems:
+        print("\n❌ Delivery problems:")
+        for line in problems[:20]:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\n✅ Every message was delivered with the right recipient, subject and token URL")
+
+    if args.save_baseline:
+        save_baseline(BASELINE_PATH, report)
+        sys.exit(0)
+    exit_on_regressions(throughput_regressions(report, args.tolerance))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the auth responses.
+
+Measures the per-response cost of each JSON encoding path FastAPI can take
+for the /auth/me (UserResponse) and /auth/login (Token) payloads, then the
+end-to-end latency of both routes in-process with FastAPI's default response
+class and, when orjson is installed, ORJSONResponse.
+
+    python tests/benchmark_serialization.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tests.helpers import FAST_HASHING, isolated_env
+
+# Cheap hashes so login latency is not all bcrypt
+os.environ.update(isolated_env("myapp-serial-", **FAST_HASHING))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; its paths are skipped without it
+    orjson = None
+
+import main
+from bulk_import import import_users
+from database import create_tables
+from models import Base
+from schemas import Token, UserResponse
+
+# Newer FastAPI deprecates ORJSONResponse; it is still measured for comparison
+warnings.filterwarnings("ignore", message="ORJSONResponse is deprecated")
+
+PASSWORD = "benchmark-password-123"
+USER = UserResponse(id=1, email="bench@example.com", name="Bench User", is_active=True, is_verified=True,
+                    created_at=datetime(2024, 1, 1, 12, 0, 0))
+TOKEN = Token(access_token="x" * 180, token_type="bearer", refresh_token="y" * 43)
+
+
+def time_per_call(fn, iterations):
+    """Median microseconds per call over five rounds"""
+    rounds = []
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        rounds.append((time.perf_counter() - start) / iterations * 1_000_000)
+    return statistics.median(rounds)
+
+
+def encoder_paths(model):
+    """Every way FastAPI can turn a response model into bytes"""
+    adapter = TypeAdapter(type(model))
+    paths = {
+        "jsonable_encoder + json.dumps": lambda: json.dumps(jsonable_encoder(model)).encode(),
+        "model_dump + json.dumps": lambda: json.dumps(adapter.dump_python(model, mode="json")).encode(),
+        "pydantic-core dump_json": lambda: adapter.dump_json(model),
+    }
+    if orjson is not None:
+        paths["model_dump + orjson"] = lambda: orjson.dumps(adapter.dump_python(model, mode="json"))
+    return paths
+
+
+async def route_latency(app, iterations):
+    """Median per-request latency (µs) of /auth/me and /auth/login through the ASGI app"""
+    transport = httpx.ASGITransport(app=app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/auth/login", json={"email": USER.email, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        calls = {
+            "GET /auth/me": lambda: client.get("/auth/me", headers=headers),
+            "POST /auth/login": lambda: client.post("/auth/login", json={"email": USER.email, "password": PASSWORD}),
+        }
+        for route, call in calls.items():
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = await call()
+                samples.append((time.perf_counter() - start) * 1_000_000)
+                assert response.status_code == 200, response.text
+            results[route] = statistics.median(samples)
+    return results
+
+
+def build_app(response_class=None):
+    app = FastAPI() if response_class is None else FastAPI(default_response_class=response_class)
+    app.include_router(main.router)
+    return app
+
+
+async def end_to_end(iterations):
+    await create_tables(Base.metadata)
+
+    async def one_user():
+        yield "email,name,password"
+        yield f"{USER.email},{USER.name},{PASSWORD}"
+
+    await import_users(one_user(), verified=True, send_email=False)
+
+    # Same routes, differing only in the app-level response class
+    apps = {"default": build_app()}
+    if orjson is not None:
+        from fastapi.responses import ORJSONResponse
+        apps["ORJSONResponse"] = build_app(ORJSONResponse)
+
+    results = {}
+    for name, app in apps.items():
+        results[name] = await route_latency(app, iterations)
+    main.hashing_pool.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Auth response serialization benchmark")
+    parser.add_argument("--iterations", type=int, default=20000, help="encodes per path and round")
+    parser.add_argument("--requests", type=int, default=300, help="requests per route and app")
+    args = parser.parse_args()
+
+    print("Benchmarking response serialization...")
+    print("=" * 50)
+    for label, model in (("UserResponse (/auth/me)", USER), ("Token (/auth/login)", TOKEN)):
+        print(f"\n{label}")
+        for path, fn in encoder_paths(model).items():
+            print(f"  {path:<32}{time_per_call(fn, args.iterations):>8.2f} µs")
+
+    print("\nEnd-to-end median latency (in-process, no network)")
+    for app_name, routes in asyncio.run(end_to_end(args.requests)).items():
+        for route, micros in routes.items():
+            print(f"  {app_name:<26}{route:<20}{micros:>9.1f} µs")
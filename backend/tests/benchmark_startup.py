@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the backend.
+
+Each run starts a fresh interpreter and times three phases: `import main`,
+`create_app()` and the lifespan startup. It reports the median of each phase
+and the slowest imports, then compares the medians to a stored baseline.
+
+    python tests/benchmark_startup.py                  # run and compare to baseline
+    python tests/benchmark_startup.py --save-baseline  # run and store a new baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(BACKEND_DIR))
+
+from tests.helpers import compare_to_baseline, exit_on_regressions, isolated_env, save_baseline
+
+BASELINE_PATH = Path(__file__).parent / "benchmark_startup_baseline.json"
+PHASES = ("import_ms", "create_app_ms", "lifespan_ms")
+
+# Runs inside a fresh interpreter and prints one JSON line of timings
+CHILD_SCRIPT = """
+import asyncio, json, sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "lifespan_ms": (started - created) * 1000,
+}))
+"""
+
+
+def child_env():
+    """The parent's environment pointed at a throwaway database"""
+    return {**os.environ, **isolated_env("myapp-startup-")}
+
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, str(BACKEND_DIR)],
+        env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, top):
+    """Modules with the largest cumulative import time, from -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {str(BACKEND_DIR)!r}); import main"],
+        env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stderr
+    # Children are printed before their parent, indented two more spaces
+    children, rows = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "main":
+                rows = children
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run_benchmark(runs):
+    env = child_env()
+    samples = [run_once(env) for _ in range(runs)]
+    return {
+        "config": {"runs": runs},
+        "phases": {phase: round(statistics.median(s[phase] for s in samples), 1) for phase in PHASES},
+    }, env
+
+
+def phase_regressions(report, tolerance):
+    """Return the phases whose median regressed beyond tolerance"""
+    def regressed(phase, value, base):
+        # Ignore sub-10ms phases; their noise is larger than any real change
+        if value > 10 and value > base * (1 + tolerance):
+            return f"{phase}: {value}ms vs baseline {base}ms"
+        return None
+
+    return compare_to_baseline(BASELINE_PATH, report, "phases", regressed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args()
+
+    print("Benchmarking MyApp backend startup...")
+    print("=" * 50)
+    report, env = run_benchmark(args.runs)
+    for phase, value in report["phases"].items():
+        print(f"{phase:<16}{value:>10} (median of {args.runs})")
+    print("\nSlowest imports of main:")
+    for cumulative_ms, name in slowest_imports(env, args.top):
+        print(f"  {cumulative_ms:>8.1f} ms  {name}")
+
+    if args.save_baseline:
+        save_baseline(BASELINE_PATH, report)
+        sys.exit(0)
+    exit_on_regressions(phase_regressions(report, args.tolerance))
@@ -0,0 +1,29 @@
+"""
+Pytest setup shared by the in-process tests.
+
+Backend modules read their settings when first imported, and pytest imports
+every test module while collecting, so the throwaway test environment is
+applied before collection starts and restored when the run ends.
+"""
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from tests.helpers import app_test_env
+
+_saved_environ = None
+
+
+def pytest_configure(config):
+    global _saved_environ
+    _saved_environ = dict(os.environ)
+    os.environ.update(app_test_env())
+
+
+def pytest_unconfigure(config):
+    if _saved_environ is not None:
+        os.environ.clear()
+        os.environ.update(_saved_environ)
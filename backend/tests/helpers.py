@@ -0,0 +1,102 @@
+"""
+Shared setup for the in-process tests and benchmarks.
+
+Backend modules read their settings when first imported, so apply an
+isolated_env() before importing main or anything that imports database.
+"""
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Optional
+
+# Cheap, fixed-cost hashes so timings are not all bcrypt
+FAST_HASHING = {
+    "PASSWORD_HASH_CALIBRATE": "False",
+    "BCRYPT_ROUNDS": "4",
+    "BCRYPT_MIN_ROUNDS": "4",
+}
+
+
+def isolated_env(prefix: str, **overrides: str) -> dict:
+    """Settings for a throwaway SQLite database with no background work, rate limits or outbound mail"""
+    env = {
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp(prefix=prefix)}/app.db",
+        "EMAIL_OUTBOX_WORKER": "False",
+        "SWEEPER_ENABLED": "False",
+        "RATE_LIMIT_ENABLED": "False",
+    }
+    # Only needed so email_service imports; a real .env keeps its own values
+    for name, value in (("MAIL_USERNAME", "test@example.com"), ("MAIL_PASSWORD", "unused"),
+                        ("MAIL_FROM", "test@example.com")):
+        if name not in os.environ:
+            env[name] = value
+    env.update(overrides)
+    return env
+
+
+def app_test_env() -> dict:
+    """isolated_env() for tests: cheap hashes and X-DB-Query-* headers on"""
+    return isolated_env("myapp-tests-", DEBUG="True", **FAST_HASHING)
+
+
+async def outbox_token(email: str, kind: str) -> Optional[str]:
+    """Read the last token that would have been emailed"""
+    from sqlalchemy import select
+
+    from database import open_session
+    from models import EmailOutbox
+
+    async with open_session() as db:
+        return await db.scalar(
+            select(EmailOutbox.token)
+            .where(EmailOutbox.recipient == email, EmailOutbox.kind == kind)
+            .order_by(EmailOutbox.id.desc())
+            .limit(1)
+        )
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def compare_to_baseline(
+    path: Path, report: dict, section: str, regressed: Callable[[str, dict, dict], Optional[str]]
+) -> List[str]:
+    """Check each entry of report[section] against the stored baseline.
+
+    regressed(name, current, baseline) returns a description of the
+    regression, or None if the entry is within tolerance.
+    """
+    if not path.exists():
+        print("No baseline stored; run with --save-baseline to create one")
+        return []
+    baseline = json.loads(path.read_text())
+    if baseline.get("config") != report["config"]:
+        print(f"Warning: baseline was recorded with {baseline.get('config')}, this run used {report['config']}")
+    regressions = []
+    for name, current in report[section].items():
+        base = baseline[section].get(name)
+        problem = regressed(name, current, base) if base else None
+        if problem:
+            regressions.append(problem)
+    return regressions
+
+
+def save_baseline(path: Path, report: dict):
+    path.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nBaseline saved to {path}")
+
+
+def exit_on_regressions(regressions: List[str]):
+    """Print regressions and exit non-zero, or confirm the run is within tolerance"""
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\n✅ Within baseline tolerance")
@@ -0,0 +1,86 @@
+"""
+In-process SMTP stand-in for delivery tests and benchmarks.
+
+Accepts any login, optionally waits before answering DATA to mimic a real
+provider, and keeps every delivered message for assertions.
+"""
+import asyncio
+import logging
+import socket
+from email import message_from_bytes, policy
+from email.message import EmailMessage
+from typing import List
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+# aiosmtpd logs a deprecation warning on every AUTH; keep benchmark output readable
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def html_body(message: EmailMessage) -> str:
+    """Decoded HTML body of a delivered message"""
+    return message.get_body(("html", "plain")).get_content()
+
+
+class _Handler:
+    def __init__(self, server: "LocalSMTPServer"):
+        self.server = server
+
+    async def handle_DATA(self, smtp, session, envelope):
+        if self.server.delay_seconds:
+            await asyncio.sleep(self.server.delay_seconds)
+        self.server.messages.append(message_from_bytes(envelope.original_content, policy=policy.default))
+        return "250 Message accepted for delivery"
+
+
+class LocalSMTPServer:
+    """aiosmtpd server on a background thread, usable as a context manager"""
+
+    def __init__(self, delay_ms: float = 0.0, port: int = 0):
+        self.host = "127.0.0.1"
+        self.port = port or free_port()
+        self.delay_seconds = delay_ms / 1000
+        self.messages: List[EmailMessage] = []
+        self._controller = Controller(
+            _Handler(self),
+            hostname=self.host,
+            port=self.port,
+            authenticator=lambda *args: AuthResult(success=True),
+            auth_require_tls=False,
+        )
+
+    def start(self):
+        self._controller.start()
+        return self
+
+    def stop(self):
+        self._controller.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def connection_config(self):
+        """SMTP settings that point email_service's connections at this server"""
+        from fastapi_mail import ConnectionConfig
+
+        return ConnectionConfig(
+            MAIL_USERNAME="standin@example.com",
+            MAIL_PASSWORD="unused",
+            MAIL_FROM="noreply@example.com",
+            MAIL_PORT=self.port,
+            MAIL_SERVER=self.host,
+            MAIL_STARTTLS=False,
+            MAIL_SSL_TLS=False,
+            USE_CREDENTIALS=True,
+            VALIDATE_CERTS=False,
+        )
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Background job election tests.
+
+Two leaders sharing a lock file stand in for two uvicorn workers: only one
+starts the jobs, and the other takes over once the first stops.
+
+    python tests/test_background.py
+"""
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from background import BackgroundLeader
+
+
+async def run():
+    lock_path = str(Path(tempfile.mkdtemp(prefix="myapp-tests-")) / "background.lock")
+    started = []
+    first = BackgroundLeader(lock_path, retry_seconds=0.01)
+    second = BackgroundLeader(lock_path, retry_seconds=0.01)
+    first.start(lambda: started.append("first"))
+    second.start(lambda: started.append("second"))
+    await asyncio.sleep(0.05)
+    assert started == ["first"] and first.is_leader and not second.is_leader
+
+    # The first worker exits; the second picks the jobs up on its next retry
+    await first.stop()
+    await asyncio.sleep(0.05)
+    assert started == ["first", "second"] and second.is_leader
+    await second.stop()
+
+
+def test_one_worker_runs_background_jobs():
+    asyncio.run(run())
+
+
+def test_without_lock_path_always_leads():
+    started = []
+    leader = BackgroundLeader("")
+    leader.start(lambda: started.append("jobs"))
+    assert started == ["jobs"] and leader.is_leader
+
+
+if __name__ == "__main__":
+    print("Testing background job election...")
+    print("=" * 50)
+    failures = 0
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name} {e}")
+    raise SystemExit(1 if failures else 0)
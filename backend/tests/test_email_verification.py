@@ -1,6 +1,7 @@
 """
 Test script for email verification functionality
-Run this after setting up your email configuration
+Run this after setting up your email configuration; the local delivery check
+needs no configuration and runs against an in-process SMTP server
 """
 
 import asyncio
@@ -12,7 +13,9 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from dotenv import load_dotenv
-from email_service import generate_verification_token, send_verification_email_simple
+import smtp_pool
+from email_service import FRONTEND_URL, generate_verification_token, send_password_reset_email, send_verification_email
+from tests.smtp_server import LocalSMTPServer, html_body
 
 # Load environment variables
 load_dotenv()
@@ -40,7 +43,7 @@ async def test_email_verification():
     # test_name = "Test User"
     # 
     # print(f"📧 Sending test email to {test_email}...")
-    # success = await send_verification_email_simple(test_email, test_name, token)
+    # success = await send_verification_email(test_email, test_name, token)
     # 
     # if success:
     #     print("✅ Test email sent successfully!")
@@ -49,5 +52,37 @@ async def test_email_verification():
     
     print("✅ Email verification system is ready!")
 
+
+async def check_local_delivery():
+    """Send both kinds of email through the real send path to a local SMTP server"""
+    token = generate_verification_token()
+    with LocalSMTPServer() as server:
+        # Point the shared pool the send helpers use at the stand-in
+        real_pool = smtp_pool.smtp_pool
+        smtp_pool.smtp_pool = smtp_pool.SMTPPool(config=server.connection_config())
+        try:
+            sent = await send_verification_email("user@example.com", "Test User", token)
+            sent = await send_password_reset_email("user@example.com", "Test User", token) and sent
+        finally:
+            await smtp_pool.smtp_pool.close()
+            smtp_pool.smtp_pool = real_pool
+
+    bodies = [html_body(message) for message in server.messages]
+    ok = (
+        sent
+        and len(bodies) == 2
+        and f"{FRONTEND_URL}/verify-email?token={token}" in bodies[0]
+        and f"{FRONTEND_URL}/reset-password?token={token}" in bodies[1]
+    )
+    print(f"{'✅' if ok else '❌'} Local delivery: {len(bodies)} messages with token URLs")
+    return ok
+
+
+def test_local_delivery():
+    assert asyncio.run(check_local_delivery())
+
+
 if __name__ == "__main__":
     asyncio.run(test_email_verification())
+    if not asyncio.run(check_local_delivery()):
+        sys.exit(1)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Idempotency-Key middleware tests, run in-process.
+
+Checks that a retried signup is answered from the store without creating a
+second user, that a key still held by a running request gets 409, that
+reusing a key with a different body gets 422, and that every one of these
+responses carries CORS headers for its own request.
+
+    python tests/test_idempotency.py
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import func, select
+
+from tests.helpers import app_test_env
+
+EMAIL = "idempotent@example.com"
+SIGNUP = {"email": EMAIL, "name": "Idempotent", "password": "password123"}
+
+
+def expect(ok, message, failures):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+def cors_origin(response):
+    return response.headers.get("access-control-allow-origin")
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    import main
+    from database import open_session
+    from idempotency import idempotency_store
+    from manage import migrate
+    from metrics import http_requests_total
+    from models import EmailOutbox, User
+
+    await migrate()
+    app = main.create_app()
+    failures = []
+
+    async with main.lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Replay: same key and body returns the first response without running signup again
+            first = await client.post("/auth/signup", json=SIGNUP,
+                                      headers={"Idempotency-Key": "signup-1", "Origin": "http://one.example"})
+            retry = await client.post("/auth/signup", json=SIGNUP,
+                                      headers={"Idempotency-Key": "signup-1", "Origin": "http://two.example"})
+            expect(first.status_code == 200 and "idempotent-replayed" not in first.headers,
+                   f"first request runs: {first.status_code}", failures)
+            expect(retry.status_code == 200 and retry.headers.get("idempotent-replayed") == "true"
+                   and retry.content == first.content, f"retry is replayed: {retry.status_code}", failures)
+            expect(cors_origin(retry) == "http://two.example",
+                   f"replay has CORS headers for its own origin: {cors_origin(retry)}", failures)
+            async with open_session() as db:
+                users = await db.scalar(select(func.count()).select_from(User).where(User.email == EMAIL))
+                emails = await db.scalar(select(func.count()).select_from(EmailOutbox).where(EmailOutbox.recipient == EMAIL))
+            expect(users == 1 and emails == 1, f"{users} user row(s) and {emails} email(s) after a retry", failures)
+            counted = [line for line in http_requests_total.render()
+                       if 'route="/auth/signup",status="200"' in line]
+            expect(counted and float(counted[0].split()[-1]) >= 2,
+                   f"replay is counted under its route: {counted}", failures)
+
+            # Different body with the same key
+            response = await client.post("/auth/signup", json={**SIGNUP, "name": "Someone Else"},
+                                         headers={"Idempotency-Key": "signup-1", "Origin": "http://one.example"})
+            expect(response.status_code == 422, f"reused key with a new body: {response.status_code}", failures)
+            expect(cors_origin(response) == "http://one.example",
+                   f"422 has CORS headers: {cors_origin(response)}", failures)
+
+            # A key claimed by a request that has not finished yet
+            body = json.dumps({"email": EMAIL}).encode()
+            idempotency_store.begin("/auth/forgot-password:in-flight", hashlib.sha256(body).hexdigest())
+            response = await client.post("/auth/forgot-password", content=body, headers={
+                "Idempotency-Key": "in-flight", "Content-Type": "application/json", "Origin": "http://one.example",
+            })
+            expect(response.status_code == 409 and response.headers.get("retry-after") == "1",
+                   f"key still in progress: {response.status_code}", failures)
+            expect(cors_origin(response) == "http://one.example",
+                   f"409 has CORS headers: {cors_origin(response)}", failures)
+
+            # Requests without a key are untouched
+            response = await client.post("/auth/signup", json=SIGNUP)
+            expect(response.status_code == 400, f"no key runs the endpoint: {response.status_code}", failures)
+
+    return failures
+
+
+def test_idempotency_keys():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing Idempotency-Key handling...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
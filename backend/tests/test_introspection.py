@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Token introspection tests, run in-process.
+
+Checks that /auth/introspect reports a valid token as active with its user,
+reports expired, tampered and deactivated-user tokens as inactive without
+disclosing anything, keeps results in request order, and rejects batches over
+INTROSPECT_MAX_TOKENS.
+
+    python tests/test_introspection.py
+"""
+import asyncio
+import os
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import update
+
+from tests.helpers import app_test_env, outbox_token
+
+ACTIVE = "introspect-active@example.com"
+REVOKED = "introspect-revoked@example.com"
+PASSWORD = "password123"
+
+
+def expect(ok, message, failures):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+async def signup_and_login(client, email):
+    await client.post("/auth/signup", json={"email": email, "name": "Introspect", "password": PASSWORD})
+    await client.post("/auth/verify-email", json={"token": await outbox_token(email, "verification")})
+    response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+    return response.json()["access_token"]
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    import main
+    from auth import INTROSPECT_MAX_TOKENS, create_access_token
+    from cache import invalidate_user
+    from database import open_session
+    from manage import migrate
+    from models import User
+
+    await migrate()
+    app = main.create_app()
+    failures = []
+
+    async with main.lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            active = await signup_and_login(client, ACTIVE)
+            revoked = await signup_and_login(client, REVOKED)
+            expired = create_access_token({"sub": ACTIVE}, expires_delta=timedelta(minutes=-5))
+            tampered = active[:-4] + ("AAAA" if not active.endswith("AAAA") else "BBBB")
+
+            # Deactivating a user revokes every access token issued to them
+            async with open_session() as db:
+                await db.execute(update(User).where(User.email == REVOKED).values(is_active=False))
+                await db.commit()
+            invalidate_user(REVOKED)
+
+            response = await client.post("/auth/introspect", json={"tokens": [active, expired, revoked, tampered]})
+            results = response.json().get("results", [])
+            expect(response.status_code == 200 and len(results) == 4,
+                   f"introspect returns one result per token: {response.status_code}", failures)
+            if len(results) == 4:
+                first = results[0]
+                expect(first["active"] and first["claims"]["sub"] == ACTIVE and first["user"]["email"] == ACTIVE,
+                       "valid token is active with its claims and user", failures)
+                for name, result in zip(("expired", "revoked", "tampered"), results[1:]):
+                    expect(result == {"active": False, "claims": None, "user": None},
+                           f"{name} token is inactive and discloses nothing: {result}", failures)
+
+            # Batch size limit
+            response = await client.post("/auth/introspect", json={"tokens": [active] * INTROSPECT_MAX_TOKENS})
+            expect(response.status_code == 200, f"{INTROSPECT_MAX_TOKENS} tokens are accepted: {response.status_code}",
+                   failures)
+            response = await client.post("/auth/introspect", json={"tokens": [active] * (INTROSPECT_MAX_TOKENS + 1)})
+            expect(response.status_code == 422,
+                   f"{INTROSPECT_MAX_TOKENS + 1} tokens are rejected: {response.status_code}", failures)
+
+    return failures
+
+
+def test_introspection():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing token introspection...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+RS256 signing key rotation tests, run in-process.
+
+Signs with one key, generates a second one, and checks that tokens signed
+with the old key still verify, new tokens carry the new kid, and the JWKS
+publishes exactly the public halves of both keys. Retiring the old key file
+then stops its tokens from verifying.
+
+    python tests/test_jwt_keys.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from jose import jwt
+
+from tests.helpers import app_test_env
+
+EMAIL = "rotation@example.com"
+
+
+def expect(ok, message, failures):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+async def fetch_jwks(client):
+    response = await client.get("/.well-known/jwks.json")
+    return {key["kid"]: key for key in response.json()["keys"]}
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    import auth
+    import jwt_keys
+    import main
+    from cache import token_cache
+
+    def reload_keys():
+        # What a restart does after a key file is added or removed
+        jwt_keys.load_key_set.cache_clear()
+        token_cache.clear()
+
+    keys_dir = tempfile.mkdtemp(prefix="myapp-tests-keys-")
+    # The rest of the suite signs with HS256, so switch only for this test
+    saved = (auth.ALGORITHM, main.ALGORITHM, jwt_keys.JWT_KEYS_DIR, jwt_keys.JWT_ACTIVE_KID)
+    auth.ALGORITHM = main.ALGORITHM = "RS256"
+    jwt_keys.JWT_KEYS_DIR, jwt_keys.JWT_ACTIVE_KID = keys_dir, ""
+    failures = []
+    try:
+        first_kid = jwt_keys.generate_key(keys_dir)
+        reload_keys()
+        old_token = auth.create_access_token({"sub": EMAIL})
+        expect(jwt.get_unverified_header(old_token).get("kid") == first_kid,
+               f"token is signed with the only key: {first_kid}", failures)
+
+        transport = httpx.ASGITransport(app=main.create_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Rotate: the newest key signs, the old one only verifies
+            second_kid = jwt_keys.generate_key(keys_dir)
+            reload_keys()
+            new_token = auth.create_access_token({"sub": EMAIL})
+            expect(jwt.get_unverified_header(new_token).get("kid") == second_kid,
+                   f"new tokens use the new kid: {second_kid}", failures)
+            expect(auth.verify_token(old_token) == EMAIL, "token signed before the rotation still verifies", failures)
+            expect(auth.verify_token(new_token) == EMAIL, "token signed after the rotation verifies", failures)
+
+            keys = await fetch_jwks(client)
+            expect(set(keys) == {first_kid, second_kid}, f"JWKS lists both kids: {sorted(keys)}", failures)
+            expect(all(key.get("kty") == "RSA" and key.get("use") == "sig" and {"n", "e"} <= key.keys()
+                       for key in keys.values()), "JWKS entries are RSA signing keys", failures)
+            expect(not any({"d", "p", "q"} & key.keys() for key in keys.values()),
+                   "JWKS holds no private key material", failures)
+            # A gateway that only has the JWKS can verify both tokens
+            for name, token, kid in (("old", old_token, first_kid), ("new", new_token, second_kid)):
+                claims = jwt.decode(token, keys[kid], algorithms=["RS256"])
+                expect(claims.get("sub") == EMAIL, f"{name} token verifies against the published key", failures)
+
+            # Retire the old key once its tokens have expired
+            os.remove(Path(keys_dir) / f"{first_kid}.pem")
+            reload_keys()
+            expect(auth.verify_token(old_token) is None, "token of a retired key is rejected", failures)
+            expect(auth.verify_token(new_token) == EMAIL, "token of the active key still verifies", failures)
+            keys = await fetch_jwks(client)
+            expect(set(keys) == {second_kid}, f"JWKS drops the retired kid: {sorted(keys)}", failures)
+    finally:
+        auth.ALGORITHM, main.ALGORITHM, jwt_keys.JWT_KEYS_DIR, jwt_keys.JWT_ACTIVE_KID = saved
+        reload_keys()
+    return failures
+
+
+def test_key_rotation():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing RS256 key rotation...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Sweeper retention tests for the email outbox, run in-process.
+
+Seeds outbox entries of every status and age, then checks that the worker
+skips entries whose token has expired and that one sweep deletes exactly the
+entries past their retention.
+
+    python tests/test_maintenance.py
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, select
+
+from tests.helpers import app_test_env
+
+DOMAIN = "@sweep.example.com"
+
+# recipient -> (kind, status, age, kept by the sweep)
+ENTRIES = {
+    "old-sent": ("verification", "sent", timedelta(days=4), False),
+    "new-sent": ("verification", "sent", timedelta(hours=1), True),
+    "old-failed": ("password_reset", "failed", timedelta(days=4), False),
+    "expired-verification": ("verification", "pending", timedelta(hours=25), False),
+    "live-verification": ("verification", "pending", timedelta(hours=23), True),
+    "expired-reset": ("password_reset", "pending", timedelta(hours=2), False),
+    "live-reset": ("password_reset", "pending", timedelta(minutes=10), True),
+}
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    from database import open_session
+    from email_outbox import OutboxWorker
+    from maintenance import sweep_once
+    from manage import migrate
+    from models import EmailOutbox
+
+    await migrate()
+    failures = []
+    now = datetime.utcnow()
+    async with open_session() as db:
+        await db.execute(insert(EmailOutbox), [
+            {
+                "kind": kind,
+                "recipient": name + DOMAIN,
+                "user_name": name,
+                "token": None if status in ("sent", "failed") else f"token-{name}",
+                "status": status,
+                "attempts": 0,
+                "next_attempt_at": now - age,
+                "created_at": now - age,
+            }
+            for name, (kind, status, age, _) in ENTRIES.items()
+        ])
+        await db.commit()
+
+    # The worker must never send a link that has already expired
+    async with open_session() as db:
+        claimed = {entry.recipient for entry in await OutboxWorker(batch_size=1000).claim_batch(db)}
+    expected = {name + DOMAIN for name, (_, status, _, kept) in ENTRIES.items() if status == "pending" and kept}
+    ok = claimed & {name + DOMAIN for name in ENTRIES} == expected
+    print(f"{'✅' if ok else '❌'} worker claims only unexpired entries: {sorted(claimed & expected)}")
+    if not ok:
+        failures.append("claim")
+
+    counts = await sweep_once()
+    async with open_session() as db:
+        left = set(await db.scalars(select(EmailOutbox.recipient).where(EmailOutbox.recipient.like(f"%{DOMAIN}"))))
+    for name, (_, status, age, kept) in ENTRIES.items():
+        ok = (name + DOMAIN in left) == kept
+        print(f"{'✅' if ok else '❌'} {status} entry {age} old is {'kept' if kept else 'deleted'}")
+        if not ok:
+            failures.append(name)
+    ok = counts["finished_emails"] == 2 and counts["expired_emails"] == 2
+    print(f"{'✅' if ok else '❌'} sweep counts: {counts}")
+    if not ok:
+        failures.append("counts")
+    return failures
+
+
+def test_outbox_retention():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing outbox retention...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
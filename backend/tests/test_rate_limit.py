@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Sliding-window rate limiter tests.
+
+Drives the counter with explicit timestamps, so window rollovers are checked
+without sleeping.
+
+    python tests/test_rate_limit.py
+"""
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+from rate_limit import MemoryRateLimiter, forwarded_client, sliding_window
+
+LIMIT = 3
+WINDOW = 10.0
+
+
+def hits(state, times):
+    """Apply hits at the given times; returns (state, retry_after of each hit)"""
+    waits = []
+    for now in times:
+        new_state, retry_after = sliding_window(state, now, LIMIT, WINDOW)
+        state = new_state or state
+        waits.append(retry_after)
+    return state, waits
+
+
+def test_limit_within_one_window():
+    state, waits = hits(None, [0, 1, 2, 3])
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    # The window ends at 10s and nothing carries over from before it
+    assert waits[3] == 7.0
+    assert state == (0, 3, 0)
+
+
+def test_previous_window_still_counts_after_rollover():
+    state, _ = hits(None, [0, 1, 2])
+    # Right at the rollover the whole previous window still overlaps
+    _, waits = hits(state, [10])
+    assert abs(waits[0] - 10 / 3) < 1e-9
+    # Halfway through, the previous window counts for 1.5 hits, leaving room for two
+    state, waits = hits(state, [15, 15, 15])
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0
+    assert state == (1, 2, 3)
+
+
+def test_retry_after_is_enough():
+    state, _ = hits(None, [0, 1, 2])
+    _, waits = hits(state, [10])
+    _, waits = hits(state, [10 + waits[0]])
+    assert waits == [0.0]
+
+
+def test_idle_for_a_full_window_resets():
+    state, _ = hits(None, [0, 1, 2])
+    # Window 1 saw no hits, so by window 2 nothing overlaps any more
+    state, waits = hits(state, [20, 20, 20, 20])
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] > 0
+    assert state == (2, 3, 0)
+
+
+def test_memory_limiter_keys_are_independent():
+    limiter = MemoryRateLimiter()
+    assert [limiter.hit("a", 2, 60) for _ in range(3)][2] > 0
+    assert limiter.hit("b", 2, 60) == 0
+    limiter.reset()
+    assert limiter.hit("a", 2, 60) == 0
+
+
+def test_checking_without_recording():
+    limiter = MemoryRateLimiter()
+    # Successful logins only check the email limit, so they never use it up
+    assert all(limiter.hit("a", 2, 60, record=False) == 0 for _ in range(5))
+    limiter.hit("a", 2, 60)
+    limiter.hit("a", 2, 60)
+    assert limiter.hit("a", 2, 60, record=False) > 0
+
+
+def test_forwarded_client_ignores_forged_entries():
+    # The client sent "6.6.6.6"; our proxy appended the address it saw
+    assert forwarded_client("6.6.6.6, 203.0.113.7", 1) == "203.0.113.7"
+    # Two proxies: the outer one added the client, the inner one added the outer proxy
+    assert forwarded_client("6.6.6.6, 203.0.113.7, 10.0.0.2", 2) == "203.0.113.7"
+    # Fewer entries than proxies: fall back to the first one
+    assert forwarded_client("203.0.113.7", 2) == "203.0.113.7"
+    assert forwarded_client("", 1) == ""
+
+
+if __name__ == "__main__":
+    print("Testing sliding-window rate limiter...")
+    print("=" * 50)
+    failures = 0
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            try:
+                test()
+                print(f"✅ {name}")
+            except AssertionError as e:
+                failures += 1
+                print(f"❌ {name} {e}")
+    raise SystemExit(1 if failures else 0)
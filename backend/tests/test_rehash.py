@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Rehash-on-login tests, run in-process.
+
+Creates a user while a weaker hash policy is active, raises the policy, and
+checks that the next successful login stores a hash that meets it: first a
+higher bcrypt cost, then a switch to argon2id. A failed login must leave the
+stored hash alone.
+
+    python tests/test_rehash.py
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import select
+
+from tests.helpers import app_test_env, outbox_token
+
+EMAIL = "rehash@example.com"
+PASSWORD = "password123"
+
+
+def expect(ok, message, failures):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+async def stored_hash(email):
+    from database import open_session
+    from models import User
+
+    async with open_session() as db:
+        return await db.scalar(select(User.hashed_password).where(User.email == email))
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    import main
+    import password_policy
+    from manage import migrate
+    from password_policy import HashPolicy, needs_rehash
+
+    await migrate()
+    app = main.create_app()
+    failures = []
+
+    async with main.lifespan(app):
+        weak = password_policy.current_policy()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.post("/auth/signup", json={"email": EMAIL, "name": "Rehash", "password": PASSWORD})
+                await client.post("/auth/verify-email", json={"token": await outbox_token(EMAIL, "verification")})
+                original = await stored_hash(EMAIL)
+
+                # Stronger bcrypt cost, as after a recalibration on faster hardware
+                stronger = weak._replace(bcrypt_rounds=weak.bcrypt_rounds + 1)
+                password_policy._current_policy = stronger
+                expect(needs_rehash(original, stronger), f"hash made under {weak.bcrypt_rounds} rounds is outdated",
+                       failures)
+                response = await client.post("/auth/login", json={"email": EMAIL, "password": "wrong-password"})
+                expect(response.status_code == 401 and await stored_hash(EMAIL) == original,
+                       f"failed login keeps the old hash: {response.status_code}", failures)
+                response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                upgraded = await stored_hash(EMAIL)
+                expect(response.status_code == 200 and upgraded != original and not needs_rehash(upgraded, stronger),
+                       f"login stores a hash with {stronger.bcrypt_rounds} rounds: {upgraded[:7]}", failures)
+
+                # Scheme change: cheap argon2id parameters keep the test fast
+                argon2id = HashPolicy(scheme="argon2id", argon2_time_cost=2, argon2_memory_cost=8192)
+                password_policy._current_policy = argon2id
+                response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                migrated = await stored_hash(EMAIL)
+                expect(response.status_code == 200 and migrated.startswith("$argon2id$")
+                       and not needs_rehash(migrated, argon2id),
+                       f"login moves the hash to argon2id: {migrated[:10]}", failures)
+                response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                expect(response.status_code == 200 and await stored_hash(EMAIL) == migrated,
+                       "a hash that meets the policy is left as is", failures)
+        finally:
+            password_policy._current_policy = weak
+
+    return failures
+
+
+def test_rehash_on_login():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing rehash on login...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Refresh token tests, run in-process.
+
+Checks that /auth/refresh rotates the refresh token, that replaying a
+rotated-out token revokes that session (and only that session), and that
+logout ends a session.
+
+    python tests/test_sessions.py
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+
+from tests.helpers import app_test_env, outbox_token
+
+EMAIL = "sessions@example.com"
+PASSWORD = "password123"
+
+
+def expect(ok, message, failures):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+async def refresh(client, refresh_token):
+    return await client.post("/auth/refresh", json={"refresh_token": refresh_token})
+
+
+async def login(client):
+    response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+    return response.json()
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    import main
+    from manage import migrate
+
+    await migrate()
+    app = main.create_app()
+    failures = []
+
+    async with main.lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/auth/signup", json={"email": EMAIL, "name": "Sessions", "password": PASSWORD})
+            await client.post("/auth/verify-email", json={"token": await outbox_token(EMAIL, "verification")})
+            first = await login(client)
+            other = await login(client)
+
+            # Rotation: the new pair works, and the refresh token changes every time
+            response = await refresh(client, first["refresh_token"])
+            rotated = response.json()
+            expect(response.status_code == 200 and rotated["refresh_token"] != first["refresh_token"],
+                   f"refresh returns a new refresh token: {response.status_code}", failures)
+            me = await client.get("/auth/me", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+            expect(me.status_code == 200, f"new access token is accepted: {me.status_code}", failures)
+            response = await refresh(client, rotated["refresh_token"])
+            expect(response.status_code == 200, f"rotated token refreshes again: {response.status_code}", failures)
+            latest = response.json()
+
+            # Reuse: replaying a rotated-out token ends the whole session
+            replayed = rotated["refresh_token"]
+            response = await refresh(client, replayed)
+            expect(response.status_code == 401, f"replayed refresh token is rejected: {response.status_code}",
+                   failures)
+            response = await refresh(client, latest["refresh_token"])
+            expect(response.status_code == 401,
+                   f"current token of the replayed session is revoked: {response.status_code}", failures)
+            response = await refresh(client, replayed)
+            expect(response.status_code == 401, f"replay stays rejected: {response.status_code}", failures)
+
+            # Other sessions of the same user are not affected
+            response = await refresh(client, other["refresh_token"])
+            expect(response.status_code == 200, f"other session still refreshes: {response.status_code}", failures)
+
+            # Logout
+            refresh_token = response.json()["refresh_token"]
+            await client.post("/auth/logout", json={"refresh_token": refresh_token})
+            response = await refresh(client, refresh_token)
+            expect(response.status_code == 401, f"refresh after logout is rejected: {response.status_code}",
+                   failures)
+
+    return failures
+
+
+def test_refresh_sessions():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing refresh token sessions...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
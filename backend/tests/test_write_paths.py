@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Concurrency test for the signup, verify-email and reset-password write paths.
+
+Fires the same request many times at once in-process and checks that exactly
+one wins, that no duplicate rows appear, and that each path stays within its
+per-request statement budget (reported by the X-DB-Query-Count header).
+
+    python tests/test_write_paths.py
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import from backend
+sys.path.append(str(Path(__file__).parent.parent))
+
+import httpx
+from sqlalchemy import func, select
+
+from tests.helpers import app_test_env, outbox_token
+
+CONCURRENCY = 20
+EMAIL = "race@example.com"
+PASSWORD = "password123"
+
+# Statements per successful request; before the rewrite these were 5, 4 and 5
+QUERY_BUDGETS = {
+    "/auth/signup": 4,  # email probe, INSERT user RETURNING, INSERT token, INSERT outbox
+    "/auth/verify-email": 2,  # UPDATE ... RETURNING, DELETE tokens
+    "/auth/reset-password": 4,  # token probe, DELETE token RETURNING, UPDATE ... RETURNING, revoke sessions
+}
+
+
+async def count(model, *conditions):
+    from database import open_session
+
+    async with open_session() as db:
+        return await db.scalar(select(func.count()).select_from(model).where(*conditions))
+
+
+async def race(client, path, body):
+    """Send the same request CONCURRENCY times at once; return (winners, losers)"""
+    responses = await asyncio.gather(*(client.post(path, json=body) for _ in range(CONCURRENCY)))
+    winners = [r for r in responses if r.status_code == 200]
+    losers = [r for r in responses if r.status_code != 200]
+    return winners, losers
+
+
+def check(path, winners, losers, failures):
+    queries = int(winners[0].headers["X-DB-Query-Count"]) if winners else None
+    ok = len(winners) == 1 and all(r.status_code == 400 for r in losers) and queries <= QUERY_BUDGETS[path]
+    print(f"{'✅' if ok else '❌'} {path}: {len(winners)} of {CONCURRENCY} succeeded, "
+          f"{queries} queries (budget {QUERY_BUDGETS[path]})")
+    if not ok:
+        failures.append(path)
+
+
+async def run():
+    # Backend modules read settings on import, so they are imported after app_test_env() is applied
+    import main
+    from manage import migrate
+    from models import AuthToken, User
+
+    await migrate()
+    app = main.create_app()
+    failures = []
+
+    async with main.lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            winners, losers = await race(client, "/auth/signup", {"email": EMAIL, "name": "Race", "password": PASSWORD})
+            check("/auth/signup", winners, losers, failures)
+            users = await count(User, User.email == EMAIL)
+            print(f"{'✅' if users == 1 else '❌'} {users} user row(s) for {EMAIL}")
+            if users != 1:
+                failures.append("duplicate users")
+
+            token = await outbox_token(EMAIL, "verification")
+            winners, losers = await race(client, "/auth/verify-email", {"token": token})
+            check("/auth/verify-email", winners, losers, failures)
+
+            # A bad token is turned away by one lookup, before any hashing
+            response = await client.post("/auth/reset-password", json={"token": "bogus", "new_password": "newpassword123"})
+            queries = int(response.headers["X-DB-Query-Count"])
+            ok = response.status_code == 400 and queries == 1
+            print(f"{'✅' if ok else '❌'} bogus reset token: {response.status_code} after {queries} query")
+            if not ok:
+                failures.append("bogus reset token")
+
+            await client.post("/auth/forgot-password", json={"email": EMAIL})
+            token = await outbox_token(EMAIL, "password_reset")
+            winners, losers = await race(
+                client, "/auth/reset-password", {"token": token, "new_password": "newpassword123"}
+            )
+            check("/auth/reset-password", winners, losers, failures)
+            # Other tests share the database, so only count this user's tokens
+            tokens = await count(AuthToken, AuthToken.user_id.in_(select(User.id).where(User.email == EMAIL)))
+            print(f"{'✅' if tokens == 0 else '❌'} {tokens} auth token(s) left")
+            if tokens != 0:
+                failures.append("leftover tokens")
+
+            response = await client.post("/auth/login", json={"email": EMAIL, "password": "newpassword123"})
+            print(f"{'✅' if response.status_code == 200 else '❌'} login with the new password: {response.status_code}")
+            if response.status_code != 200:
+                failures.append("login")
+
+    return failures
+
+
+def test_concurrent_write_paths():
+    assert asyncio.run(run()) == []
+
+
+if __name__ == "__main__":
+    os.environ.update(app_test_env())
+    print("Testing concurrent write paths...")
+    print("=" * 50)
+    raise SystemExit(1 if asyncio.run(run()) else 0)
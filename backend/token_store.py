@@ -0,0 +1,79 @@
+import hashlib
+
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from typing import Optional, Tuple
+
+from email_service import generate_verification_token
+from models import AuthToken
+
+
+# Token purposes and how long each stays valid
+VERIFICATION = "verification"
+PASSWORD_RESET = "password_reset"
+
+TOKEN_TTLS = {
+    VERIFICATION: timedelta(hours=24),
+    PASSWORD_RESET: timedelta(hours=1),
+}
+
+
+def hash_token(token: str) -> str:
+    """Fixed-length lookup key for a token; the raw value is never stored"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def new_token_row(user_id: int, purpose: str) -> Tuple[str, dict]:
+    """Generate a token and the auth_tokens row that stores its hash"""
+    token = generate_verification_token()
+    row = {
+        "token_hash": hash_token(token),
+        "purpose": purpose,
+        "user_id": user_id,
+        "expires_at": datetime.utcnow() + TOKEN_TTLS[purpose],
+    }
+    return token, row
+
+
+def issue_token(db, user_id: int, purpose: str) -> str:
+    """Create a token for a user and return the raw value to email"""
+    token, row = new_token_row(user_id, purpose)
+    db.add(AuthToken(**row))
+    return token
+
+
+async def revoke_tokens(db, user_id: int, purpose: str):
+    """Delete every token of one purpose for a user"""
+    await db.execute(
+        delete(AuthToken)
+        .where(AuthToken.user_id == user_id, AuthToken.purpose == purpose)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def token_owner(token: str, purpose: str):
+    """Scalar subquery for the user id behind an unexpired token"""
+    return (
+        select(AuthToken.user_id)
+        .where(
+            AuthToken.token_hash == hash_token(token),
+            AuthToken.purpose == purpose,
+            AuthToken.expires_at > datetime.utcnow(),
+        )
+        .scalar_subquery()
+    )
+
+
+async def consume_token(db, token: str, purpose: str) -> Optional[int]:
+    """Delete an unexpired token and its siblings in one statement, returning the user id.
+
+    Concurrent requests with the same token cannot both succeed: the loser's
+    DELETE matches no rows once the winner's has committed.
+    """
+    result = await db.execute(
+        delete(AuthToken)
+        .where(AuthToken.purpose == purpose, AuthToken.user_id == token_owner(token, purpose))
+        .returning(AuthToken.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalars().first()